@@ -0,0 +1,55 @@
+# !usr/bin/python
+
+# frame and ai times of a headless game with more and more monsters, run with python -m bench.ai
+
+import random
+from src.amnesiaRL import AmnesiaRL
+from src.amnesiaRL import INTERFACE_HEIGHT
+from src.amnesiaRL import SCREEN_HEIGHT
+from src.amnesiaRL import SCREEN_WIDTH
+from src.profiler import Profiler
+from src.render import HeadlessBackend
+from src.render import KEY_DOWN
+from src.render import KEY_LEFT
+from src.render import KEY_RIGHT
+from src.render import KEY_UP
+from src.render import Key
+
+MONSTER_COUNTS = [1, 2, 5, 10, 20, 35, 50]
+FRAMES = 400
+SEED = 1
+
+
+def run(monster_count):
+    # the same walk for every count, the player is kept alive so every run lasts FRAMES frames
+    moves = random.Random(SEED)
+    keys = [Key(vk=moves.choice([KEY_LEFT, KEY_RIGHT, KEY_UP, KEY_DOWN])) for _ in range(FRAMES)]
+    profiler = Profiler()
+    # every monster is out from the start
+    game = AmnesiaRL(HeadlessBackend(SCREEN_WIDTH, SCREEN_HEIGHT + INTERFACE_HEIGHT, keys), profiler, monster_count,
+                     spawn_delay=0)
+
+    for _ in range(FRAMES):
+        game.player.health = 100
+        game.player.sanity = 100
+        game.render()
+    spawned = len([monster for monster in game.scheduler.monsters if monster.is_spawned])
+    return profiler, spawned
+
+
+def main():
+    print(str(FRAMES) + ' frames')
+    print(format('monsters', '>8') + format('spawned', '>9') + format('ai p50', '>9') + format('ai p95', '>9') +
+          format('frame p50', '>11') + format('frame p95', '>11') + format('actions', '>9'))
+    for monster_count in MONSTER_COUNTS:
+        profiler, spawned = run(monster_count)
+        print(format(monster_count, '>8') + format(spawned, '>9') +
+              format(profiler.percentile('ai', 50) * 1000, '>9.3f') +
+              format(profiler.percentile('ai', 95) * 1000, '>9.3f') +
+              format(profiler.percentile('frame', 50) * 1000, '>11.3f') +
+              format(profiler.percentile('frame', 95) * 1000, '>11.3f') +
+              format(profiler.totals.get('ai_actions', 0), '>9'))
+
+
+if __name__ == "__main__":
+    main()
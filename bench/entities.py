@@ -0,0 +1,67 @@
+# !usr/bin/python
+
+# cost of moving, looking up tiles and drawing as the floor fills with entities, run with python -m bench.entities
+
+import time
+from src import entity
+from src.amnesiaRL import AmnesiaRL
+from src.amnesiaRL import INTERFACE_HEIGHT
+from src.amnesiaRL import SCREEN_HEIGHT
+from src.amnesiaRL import SCREEN_WIDTH
+from src.native import random_int
+from src.render import HeadlessBackend
+
+ENTITY_COUNTS = [0, 100, 1000, 10000]
+MOVES = 20000
+DRAWS = 200
+
+
+def main():
+    game = AmnesiaRL(HeadlessBackend(SCREEN_WIDTH, SCREEN_HEIGHT + INTERFACE_HEIGHT))
+    level = game.level
+    walkable = level.tiles.walkable
+    floors = [(x, y) for x in range(level.width) for y in range(level.height) if walkable[x, y]]
+    # a monster pacing between two tiles, the player is moved out of its way
+    monster = game.scheduler.monsters[0]
+    x, y = next((x, y) for x, y in floors if walkable[x + 1, y] and not game.entity_index.at(x, y) and
+                not game.entity_index.at(x + 1, y))
+    # what the player sees is what gets drawn
+    level.draw(game.player, SCREEN_WIDTH, SCREEN_HEIGHT)
+    game.player.place(None, None)
+    monster.x = x
+    monster.y = y
+    game.add_entity(monster)
+
+    print(str(MOVES) + ' moves')
+    print(format('extra entities', '>14') + format('entities', '>10') + format('us per move', '>13') +
+          format('us per lookup', '>15') + format('us per draw', '>13'))
+    added = 0
+    for count in ENTITY_COUNTS:
+        # fuel cans don't block, so they can pile up anywhere without getting in the way
+        while added < count:
+            fx, fy = floors[random_int(0, len(floors) - 1)]
+            game.add_entity(entity.Fuel(fx, fy, level.fov_map, game.con, game))
+            added += 1
+
+        start = time.perf_counter()
+        for i in range(MOVES):
+            monster.move(1 if i % 2 == 0 else -1, 0, level.tiles)
+        move_us = (time.perf_counter() - start) * 1000000 / MOVES
+
+        start = time.perf_counter()
+        for i in range(MOVES):
+            fx, fy = floors[i % len(floors)]
+            monster.check_is_walkable(fx, fy)
+        lookup_us = (time.perf_counter() - start) * 1000000 / MOVES
+
+        start = time.perf_counter()
+        for i in range(DRAWS):
+            game.renderables.draw(game.con, game.player.fov, level.top_left, level.bottom_right, level.light_map)
+        draw_us = (time.perf_counter() - start) * 1000000 / DRAWS
+
+        print(format(count, '>14') + format(len(game.entities), '>10') + format(move_us, '>13.2f') +
+              format(lookup_us, '>15.2f') + format(draw_us, '>13.2f'))
+
+
+if __name__ == "__main__":
+    main()
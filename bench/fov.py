@@ -0,0 +1,88 @@
+# !usr/bin/python
+
+# times every fov backend from each room center of a generated floor, run with python -m bench.fov,
+# without the native libtcod only the shadowcast backend is timed
+
+import numpy
+import random
+import time
+from src import fov
+from src.native import libtcod
+
+RADII = [4, 6, 8, 10, 12, 15, 20, 25]
+REPEATS = 20
+SEED = 1
+
+# like the level's constants, so the floor looks like one the game would make
+MAP_WIDTH = 80
+MAP_HEIGHT = 60
+ROOM_MAX_SIZE = 10
+ROOM_MIN_SIZE = 4
+MAX_ROOMS = 30
+
+
+def make_floor(rng):
+    # rooms joined by corridors as an [x, y] transparency array, and the room centers
+    transparent = numpy.zeros((MAP_WIDTH, MAP_HEIGHT), dtype=bool)
+    rooms = []
+    centers = []
+    for _ in range(MAX_ROOMS):
+        w = rng.randint(ROOM_MIN_SIZE, ROOM_MAX_SIZE)
+        h = rng.randint(ROOM_MIN_SIZE, ROOM_MAX_SIZE)
+        x = rng.randint(0, MAP_WIDTH - w - 1)
+        y = rng.randint(0, MAP_HEIGHT - h - 1)
+        if any(x <= x2 and x + w >= x1 and y <= y2 and y + h >= y1 for x1, y1, x2, y2 in rooms):
+            continue
+        transparent[x + 1:x + w, y + 1:y + h] = True
+        center = (x + w // 2, y + h // 2)
+        if centers:
+            px, py = centers[-1]
+            transparent[min(px, center[0]):max(px, center[0]) + 1, py] = True
+            transparent[center[0], min(py, center[1]):max(py, center[1]) + 1] = True
+        rooms.append((x, y, x + w, y + h))
+        centers.append(center)
+    return transparent, centers
+
+
+def native_map(transparent):
+    # a libtcod map of the floor, or None if libtcod can't be loaded
+    if libtcod is None:
+        return None
+    fov_map = libtcod.map_new(MAP_WIDTH, MAP_HEIGHT)
+    fov.set_fov_properties(fov_map, transparent, transparent)
+    return fov_map
+
+
+def time_backend(backend, fov_map, transparent, algorithm, origins, radius):
+    # milliseconds per call, and the cells seen from all origins
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for x, y in origins:
+            backend.compute(fov_map, transparent, x, y, radius, True, algorithm)
+    ms = (time.perf_counter() - start) * 1000 / (REPEATS * len(origins))
+
+    seen = 0
+    for x, y in origins:
+        seen += int(backend.compute(fov_map, transparent, x, y, radius, True, algorithm).sum())
+    return ms, seen
+
+
+def main():
+    transparent, origins = make_floor(random.Random(SEED))
+    fov_map = native_map(transparent)
+    names = sorted(fov.BACKENDS)
+
+    print(str(len(origins)) + ' origins, ' + str(REPEATS) + ' repeats')
+    if fov_map is None:
+        print('libtcod could not be loaded, only timing ' + ', '.join(names))
+    print('radius' + ''.join(format(name + ' ms', '>16') + format('seen', '>8') for name in names))
+    for radius in RADII:
+        line = format(radius, '>6')
+        for name in names:
+            ms, seen = time_backend(fov.BACKENDS[name], fov_map, transparent, fov.FOV_RESTRICTIVE, origins, radius)
+            line += format(ms, '>16.3f') + format(seen, '>8')
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
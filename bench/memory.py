@@ -0,0 +1,48 @@
+# !usr/bin/python
+
+# memory held by a floor as the map gets bigger, run with python -m bench.memory
+
+from src.amnesiaRL import AmnesiaRL
+from src.amnesiaRL import INTERFACE_HEIGHT
+from src.amnesiaRL import MAP_HEIGHT
+from src.amnesiaRL import MAP_WIDTH
+from src.amnesiaRL import SCREEN_HEIGHT
+from src.amnesiaRL import SCREEN_WIDTH
+from src.memory import floor_memory
+from src.render import HeadlessBackend
+from src.render import KEY_LEFT
+from src.render import KEY_RIGHT
+from src.render import Key
+
+SCALES = [1, 2, 4, 8]
+FRAMES = 50
+
+
+def main():
+    print('kilobytes after ' + str(FRAMES) + ' frames')
+    header = None
+    for scale in SCALES:
+        width = MAP_WIDTH * scale
+        height = MAP_HEIGHT * scale
+        # a short walk so the lights, sounds and distance fields are filled in
+        keys = [Key(vk=KEY_RIGHT if i % 2 == 0 else KEY_LEFT) for i in range(FRAMES)]
+        game = AmnesiaRL(HeadlessBackend(SCREEN_WIDTH, SCREEN_HEIGHT + INTERFACE_HEIGHT, keys), map_width=width,
+                         map_height=height)
+        for _ in range(FRAMES):
+            game.player.health = 100
+            game.player.sanity = 100
+            game.render()
+
+        parts = floor_memory(game)
+        if header is None:
+            header = format('map', '>9') + ''.join(format(name, '>14') for name, _ in parts) + format('total', '>10')
+            print(header)
+        print(format(str(width) + 'x' + str(height), '>9') +
+              ''.join(format(size / 1024, '>14.1f') for _, size in parts) +
+              format(sum(size for _, size in parts) / 1024, '>10.1f'))
+        game.scheduler.delete()
+        game.level.delete()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# !usr/bin/python
+
+import heapq
+import itertools
+from src.fov import FOV_RESTRICTIVE
+from src.fov import compute_fov
+
+
+# drives every monster on a floor, each one only acts on the frames it is due
+class MonsterScheduler:
+    SIGHT_RANGE = 25
+
+    def __init__(self, level, player, game):
+        self.level = level
+        self.player = player
+        self.game = game
+        self.monsters = []
+        # (due frame, insertion order, monster), the order breaks ties so monsters are never compared
+        self.queue = []
+        self.order = itertools.count()
+        self.frame = 0
+        self.turn_based = game.turn_based
+
+        # where the player can be seen from, shared by every monster's sight check
+        self.sight = None
+        self.sight_key = None
+
+    def add(self, monster, spawn_delay=None):
+        # the monster first tries to spawn after spawn_delay frames, its own random delay if None
+        self.monsters.append(monster)
+        if spawn_delay is None:
+            spawn_delay = monster.spawn_delay
+        self.schedule(monster, spawn_delay)
+
+    def schedule(self, monster, delay):
+        heapq.heappush(self.queue, (self.frame + delay, next(self.order), monster))
+
+    def update(self, light_map):
+        self.frame += 1
+        if self.game.turn_based != self.turn_based:
+            self.turn_based = self.game.turn_based
+            if self.turn_based:
+                # every turn is a frame now, spawned monsters shouldn't sit out several turns
+                self.queue = [(min(due, self.frame) if monster.is_spawned else due, order, monster)
+                              for due, order, monster in self.queue]
+                heapq.heapify(self.queue)
+
+        # perception first, every spawned monster reads the same shared sight, sound and distance fields
+        spawned = [monster for monster in self.monsters if monster.is_spawned]
+        if spawned:
+            sight = self.player_sight()
+            for monster in spawned:
+                monster.perceive(light_map, sight)
+
+        while self.queue and self.queue[0][0] <= self.frame:
+            _, _, monster = heapq.heappop(self.queue)
+            self.schedule(monster, monster.act(self.frame))
+            self.game.profiler.count('ai_actions')
+
+    def player_sight(self):
+        # one fov from the player stands in for every monster's own, only recomputed when the player or map changed
+        key = (self.player.x, self.player.y, self.level.map_version)
+        if key != self.sight_key:
+            fov_map = self.level.fov_pool.borrow()
+            try:
+                self.sight = compute_fov(fov_map, self.level.fov_pool.transparent, self.player.x, self.player.y,
+                                         self.SIGHT_RANGE, True, FOV_RESTRICTIVE)
+            finally:
+                self.level.fov_pool.give_back(fov_map)
+            self.sight_key = key
+        return self.sight
+
+    def delete(self):
+        # frees the monsters' paths, call before the level is deleted
+        for monster in self.monsters:
+            monster.delete()
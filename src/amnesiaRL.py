@@ -1,10 +1,21 @@
 # !usr/bin/python
 
-from lib import libtcodpy as libtcod
+import os
 from src import entity
+from src import fov
+from src.ai import MonsterScheduler
+from src.colors import red
+from src.colors import white
 from src.level import Level
-from src.level import Tile
+from src.native import libtcod
 from src.pathing import Light
+from src.profiler import Profiler
+from src.render import FrameBuffer
+from src.render import KEY_DOWN
+from src.render import KEY_LEFT
+from src.render import KEY_RIGHT
+from src.render import KEY_UP
+from src.render import LibtcodBackend
 
 # constants
 SCREEN_WIDTH = 59
@@ -13,23 +24,38 @@ INTERFACE_HEIGHT = 10
 MAP_WIDTH = 80
 MAP_HEIGHT = 60
 LIMIT_FPS = 25
-
-# libtcod specific settings
-libtcod.console_set_custom_font(b'res/terminal12x12_gs_ro.png',
-                                libtcod.FONT_TYPE_GREYSCALE | libtcod.FONT_LAYOUT_ASCII_INROW)
-libtcod.console_init_root(SCREEN_WIDTH, SCREEN_HEIGHT + INTERFACE_HEIGHT, b'AmnesiaRL', False)
-con = libtcod.console_new(SCREEN_WIDTH, SCREEN_HEIGHT + INTERFACE_HEIGHT)
-libtcod.sys_set_fps(LIMIT_FPS)
-libtcod.console_disable_keyboard_repeat()
+MONSTERS_PER_FLOOR = 1
+MAX_FREE_ENTITIES = 50  # per class, destroyed entities past this are left to the garbage collector
 
 
 class AmnesiaRL:
-    def __init__(self):
-        self.level = Level(MAP_WIDTH, MAP_HEIGHT, con, self)
-        self.player = entity.Player(0, 0, self.level.fov_map, con, self)
-        self.monster = entity.Monster(0, 0, self.level, self.player, self.level.monster_fov, con, self)
-        self.entities = [self.player, self.monster]
+    def __init__(self, backend, profiler=None, monster_count=MONSTERS_PER_FLOOR, map_width=MAP_WIDTH,
+                 map_height=MAP_HEIGHT, spawn_delay=None):
+        # everything below reads libtcod's fov maps directly when it is loaded
+        if libtcod is not None:
+            fov.check_native_layout()
+
+        # everything draws into con, the backend decides where finished frames go
+        self.backend = backend
+        if profiler is None:
+            profiler = Profiler()
+        self.profiler = profiler
+        self.con = FrameBuffer(SCREEN_WIDTH, SCREEN_HEIGHT + INTERFACE_HEIGHT)
+        self.map_width = map_width
+        self.map_height = map_height
+        self.level = Level(self.map_width, self.map_height, self.con, self)
+        self.player = entity.Player(0, 0, self.level.fov_map, self.con, self)
+        self.monster_count = monster_count
+        # frames before the monsters of each floor first try to spawn, None for each monster's own random delay
+        self.spawn_delay = spawn_delay
+        self.entities = []
+        self.entity_index = entity.EntityIndex()
+        self.renderables = entity.Renderables()
+        # class -> destroyed entities waiting to be reused
+        self.free_entities = {}
+        self.add_entity(self.player)
         self.turn_based = True
+        self.add_monsters()
         self.level.create_map(self.player, self)
         self.floor = 0
 
@@ -38,22 +64,22 @@ class AmnesiaRL:
 
         if self.turn_based:
             # game will pause to wait for user input
-            key = libtcod.console_wait_for_keypress(True)
+            key = self.backend.wait_for_keypress()
         else:
             # game will continue without user input
-            key = libtcod.console_check_for_keypress(libtcod.KEY_PRESSED)
+            key = self.backend.check_for_keypress()
         if not self.player.performing_action:
 
-            if key.vk == libtcod.KEY_LEFT:
+            if key.vk == KEY_LEFT:
                 self.player.move(-1, 0, self.level.tiles)
 
-            elif key.vk == libtcod.KEY_RIGHT:
+            elif key.vk == KEY_RIGHT:
                 self.player.move(1, 0, self.level.tiles)
 
-            elif key.vk == libtcod.KEY_UP:
+            elif key.vk == KEY_UP:
                 self.player.move(0, -1, self.level.tiles)
 
-            elif key.vk == libtcod.KEY_DOWN:
+            elif key.vk == KEY_DOWN:
                 self.player.move(0, 1, self.level.tiles)
 
             elif key.c == ord('l'):
@@ -73,69 +99,144 @@ class AmnesiaRL:
 
             elif key.c == ord('s'):
                 self.player.toggle_sneak()
+
+            elif key.c == ord('p'):
+                self.profiler.show_overlay = not self.profiler.show_overlay
         else:
-            if key.vk == libtcod.KEY_LEFT:
+            if key.vk == KEY_LEFT:
                 self.player.perform_action(-1, 0)
 
-            elif key.vk == libtcod.KEY_RIGHT:
+            elif key.vk == KEY_RIGHT:
                 self.player.perform_action(1, 0)
 
-            elif key.vk == libtcod.KEY_UP:
+            elif key.vk == KEY_UP:
                 self.player.perform_action(0, -1)
 
-            elif key.vk == libtcod.KEY_DOWN:
+            elif key.vk == KEY_DOWN:
                 self.player.perform_action(0, 1)
 
     def render(self):
         if self.player.health > 0 and self.player.sanity > 0:
+            profiler = self.profiler
             # renders the game components
-            libtcod.console_clear(con)
+            self.con.clear()
 
-            Light.clear_brightness(self.level.tiles)
+            with profiler.phase('clear'):
+                Light.clear_brightness(self.level.light_map)
 
-            for e in reversed(self.entities):
-                e.light.calculate_tile_brightness(self.level.tiles, e.x, e.y, self.level.top_left, self.level.bottom_right, self.level.fov_map)
+            with profiler.phase('light'):
+                for e in reversed(self.level.visible_light_sources()):
+                    e.light.calculate_tile_brightness(self.level.light_map, e.x, e.y, self.level.top_left, self.level.bottom_right, self.level.fov_pool)
+                    profiler.count('lights')
 
-            self.level.draw(self.player, SCREEN_WIDTH, SCREEN_HEIGHT)
+            with profiler.phase('map'):
+                self.level.draw(self.player, SCREEN_WIDTH, SCREEN_HEIGHT)
 
-            for e in reversed(self.entities):
-                e.draw(self.level.fov_map, self.level.top_left, self.level.bottom_right, self.level.tiles)
+            with profiler.phase('ents'):
+                self.renderables.draw(self.con, self.player.fov, self.level.top_left, self.level.bottom_right,
+                                      self.level.light_map)
+                for monster in self.scheduler.monsters:
+                    monster.draw(self.player.fov, self.level.top_left, self.level.bottom_right, self.level.light_map)
 
             if not self.player.performing_action or not self.turn_based:
-                self.monster.update(self.level.tiles)
-                self.player.update(self.level.tiles)
-
-            libtcod.console_set_default_foreground(con, libtcod.white)
-            libtcod.console_set_color_control(con, libtcod.white, libtcod.black)
-            libtcod.console_print(con, 5, SCREEN_HEIGHT + 2, "Fue: " + str(int(self.player.fuel)))
-            libtcod.console_print(con, 5, SCREEN_HEIGHT + 3, "San: " + str(int(self.player.sanity)))
-            libtcod.console_print(con, 5, SCREEN_HEIGHT + 4, "Hea: " + str(int(self.player.health)))
-            libtcod.console_print(con, 5, SCREEN_HEIGHT + 5, "Sta: " + str(int(self.player.stamina)))
-            libtcod.console_print(con, 5, SCREEN_HEIGHT + 6, "Vis: " + str(int(self.level.tiles[self.player.x][self.player.y].brightness)))
-            libtcod.console_print(con, 5, SCREEN_HEIGHT + 7, "Noi: " + str(int(self.player.noise.volume)))
-            if self.player.is_sneaking:
-                libtcod.console_print(con, 35, SCREEN_HEIGHT + 4, "SNEAKING")
-
-            libtcod.console_blit(con, 0, 0, SCREEN_WIDTH, SCREEN_HEIGHT + 10, 0, 0, 0)
-            libtcod.console_flush()
-
-            for e in reversed(self.entities):
-                e.clear()
-
-            self.handle_keys()
+                with profiler.phase('ai'):
+                    self.scheduler.update(self.level.light_map)
+                with profiler.phase('plyr'):
+                    self.player.update(self.level.light_map)
+
+            with profiler.phase('hud'):
+                self.con.set_default_foreground(white)
+                self.con.print(5, SCREEN_HEIGHT + 2, "Fue: " + str(int(self.player.fuel)))
+                self.con.print(5, SCREEN_HEIGHT + 3, "San: " + str(int(self.player.sanity)))
+                self.con.print(5, SCREEN_HEIGHT + 4, "Hea: " + str(int(self.player.health)))
+                self.con.print(5, SCREEN_HEIGHT + 5, "Sta: " + str(int(self.player.stamina)))
+                self.con.print(5, SCREEN_HEIGHT + 6, "Vis: " + str(int(self.level.light_map.brightness_at(self.player.x, self.player.y))))
+                self.con.print(5, SCREEN_HEIGHT + 7, "Noi: " + str(int(self.player.noise.volume)))
+                if self.player.is_sneaking:
+                    self.con.print(35, SCREEN_HEIGHT + 4, "SNEAKING")
+                if profiler.show_overlay:
+                    # right of the stats and below the sneaking label
+                    for i, line in enumerate(profiler.overlay_lines(SCREEN_WIDTH - 16)[:INTERFACE_HEIGHT - 5]):
+                        self.con.print(15, SCREEN_HEIGHT + 5 + i, line)
+
+            with profiler.phase('blit'):
+                self.backend.present(self.con, self.level.top_left)
+
+            with profiler.phase('input'):
+                self.handle_keys()
+
+            profiler.end_frame()
 
             return True
         else:
             self.game_over()
             return False
 
+    def add_entity(self, e):
+        # the entity goes into the store of each system that needs it, by the components it has
+        self.entities.append(e)
+        self.entity_index.add(e)
+        if e.is_renderable:
+            self.renderables.add(e)
+        if e.light is not None:
+            self.level.add_light_source(e)
+
+    def despawn_entity(self, e):
+        # takes an entity off the floor, it can be added back later
+        self.entities.remove(e)
+        self.entity_index.remove(e)
+        self.renderables.remove(e)
+        if e.light is not None:
+            self.level.remove_light_source(e)
+        if self.player.grabbed_entity is e:
+            self.player.drop()
+        e.x = None
+        e.y = None
+
+    def destroy_entity(self, e):
+        # despawns an entity for good, reusable ones go on the free-list for reuse_entity
+        self.despawn_entity(e)
+        self.free_entity(e)
+
+    def free_entity(self, e):
+        if e.is_reusable:
+            free = self.free_entities.setdefault(type(e), [])
+            if len(free) < MAX_FREE_ENTITIES:
+                free.append(e)
+
+    def reuse_entity(self, cls, x, y, fov_map):
+        # a destroyed entity of the class made new again at (x, y), or None if there are none
+        free = self.free_entities.get(cls)
+        if not free:
+            return None
+        e = free.pop()
+        e.reset(x, y, fov_map)
+        return e
+
+    def add_monsters(self):
+        # monsters start off the floor, the scheduler spawns them and decides when each one acts
+        self.scheduler = MonsterScheduler(self.level, self.player, self)
+        for _ in range(self.monster_count):
+            monster = entity.Monster(None, None, self.level, self.player, self.level.fov_map, self.con, self)
+            self.scheduler.add(monster, self.spawn_delay)
+
     def descend_floor(self):
+        self.scheduler.delete()
+        self.level.delete()
         self.floor += 1
-        self.level = Level(MAP_WIDTH, MAP_HEIGHT, con, self)
-        self.monster = entity.Monster(25, 24, self.level, self.player, self.level.monster_fov, con, self)
+        self.level = Level(self.map_width, self.map_height, self.con, self)
         self.player.entity_fov_map = self.level.fov_map
-        self.entities = [self.player, self.monster]
+        # whatever the player was dragging stays on the old floor
+        self.player.drop()
+        # what is left of the last floor can be reused by this one
+        for e in self.entities:
+            self.free_entity(e)
+        self.entities = []
+        self.entity_index = entity.EntityIndex()
+        self.renderables = entity.Renderables()
+        self.add_entity(self.player)
         self.turn_based = True
+        self.add_monsters()
         self.level.create_map(self.player, self)
         self.level.draw(self.player, SCREEN_WIDTH, SCREEN_HEIGHT)
 
@@ -149,37 +250,46 @@ class AmnesiaRL:
         elif self.player.sanity <= 0:
             game_over_result = "You have gone stark raving mad"
 
-        libtcod.console_clear(con)
-
-        libtcod.console_set_default_foreground(con, libtcod.red)
-        libtcod.console_print(con, round(SCREEN_WIDTH / 2 - len(game_over_string) / 2), round(SCREEN_HEIGHT / 2 - 5),
-                              game_over_string)
-        libtcod.console_set_default_foreground(con, libtcod.white)
-        libtcod.console_print(con, round(SCREEN_WIDTH / 2 - len(game_over_result) / 2), round(SCREEN_HEIGHT / 2 - 4),
-                              game_over_result)
-        libtcod.console_print(con, round(SCREEN_WIDTH / 2 - len(game_over_score) / 2), round(SCREEN_HEIGHT / 2 - 2),
-                              game_over_score)
-        libtcod.console_print(con, round(SCREEN_WIDTH / 2 - len(game_over_instructions) / 2),
-                              round(SCREEN_HEIGHT / 2 - 1), game_over_instructions)
-        libtcod.console_blit(con, 0, 0, SCREEN_WIDTH, SCREEN_HEIGHT + INTERFACE_HEIGHT, 0, 0, 0)
-        libtcod.console_flush()
-
-        libtcod.console_wait_for_keypress(True)
-
-
-def main():
-    # initializes the game object
-    game = AmnesiaRL()
+        self.con.clear()
+
+        self.con.set_default_foreground(red)
+        self.con.print(round(SCREEN_WIDTH / 2 - len(game_over_string) / 2), round(SCREEN_HEIGHT / 2 - 5),
+                       game_over_string)
+        self.con.set_default_foreground(white)
+        self.con.print(round(SCREEN_WIDTH / 2 - len(game_over_result) / 2), round(SCREEN_HEIGHT / 2 - 4),
+                       game_over_result)
+        self.con.print(round(SCREEN_WIDTH / 2 - len(game_over_score) / 2), round(SCREEN_HEIGHT / 2 - 2),
+                       game_over_score)
+        self.con.print(round(SCREEN_WIDTH / 2 - len(game_over_instructions) / 2),
+                       round(SCREEN_HEIGHT / 2 - 1), game_over_instructions)
+        self.backend.present(self.con)
+
+        self.backend.wait_for_keypress()
+
+
+def main(backend=None, profile_path=None, fov_backend=None):
+    if fov_backend is not None:
+        fov.use_backend(fov_backend)
+    if backend is None:
+        backend = LibtcodBackend(SCREEN_WIDTH, SCREEN_HEIGHT + INTERFACE_HEIGHT, SCREEN_HEIGHT, b'AmnesiaRL',
+                                 b'res/terminal12x12_gs_ro.png', LIMIT_FPS)
+
+    # initializes the game object, frame timings go to profile_path as json lines if it is set
+    profiler = Profiler(profile_path)
+    game = AmnesiaRL(backend, profiler)
     game.level.draw(game.player, SCREEN_WIDTH, SCREEN_HEIGHT)
 
     # constantly renders while the program window is still open
-    while not libtcod.console_is_window_closed():
-        libtcod.console_set_default_foreground(con, libtcod.white)
-        if not game.render():
-            return
+    try:
+        while not backend.is_window_closed():
+            game.con.set_default_foreground(white)
+            if not game.render():
+                return
+    finally:
+        profiler.close()
 
 
 if __name__ == "__main__":
     # program starting point
     # run the main method
-    main()
\ No newline at end of file
+    main(profile_path=os.environ.get('AMNESIARL_PROFILE'), fov_backend=os.environ.get('AMNESIARL_FOV'))
\ No newline at end of file
@@ -0,0 +1,29 @@
+# !usr/bin/python
+
+import numpy
+from collections import namedtuple
+
+# colors are plain (r, g, b) values so nothing but the console renderer needs libtcod
+Color = namedtuple('Color', ('r', 'g', 'b'))
+
+# the libtcod named colors the game uses, with the same values
+white = Color(255, 255, 255)
+red = Color(255, 0, 0)
+light_gray = Color(159, 159, 159)
+darkest_sepia = Color(31, 24, 15)
+light_sepia = Color(158, 134, 100)
+lightest_sepia = Color(222, 211, 195)
+orange = Color(255, 127, 0)
+darker_orange = Color(127, 63, 0)
+lighter_orange = Color(255, 210, 165)
+amber = Color(255, 191, 0)
+azure = Color(0, 127, 255)
+darker_azure = Color(0, 63, 127)
+light_azure = Color(114, 184, 255)
+light_green = Color(114, 255, 114)
+
+
+def lerp(c1, c2, a):
+    # libtcod's color_lerp, it works in single precision floats and truncates each channel
+    a = numpy.float32(a)
+    return Color(*(int(numpy.float32(v1) + numpy.float32(v2 - v1) * a) for v1, v2 in zip(c1, c2)))
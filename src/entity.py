@@ -1,13 +1,144 @@
 # !usr/bin/python
 
+import itertools
 import math
-from lib import libtcodpy as libtcod
+import numpy
+from src.colors import amber
+from src.colors import azure
+from src.colors import darker_azure
+from src.colors import darker_orange
+from src.colors import darkest_sepia
+from src.colors import light_azure
+from src.colors import light_gray
+from src.colors import light_green
+from src.colors import lighter_orange
+from src.colors import orange
+from src.colors import red
+from src.colors import white
+from src.fov import FOV_RESTRICTIVE
+from src.fov import compute_fov
+from src.native import random_float
+from src.native import random_int
 from src.pathing import Light
 from src.pathing import Noise
-
-
-# entities are the player, objects, items and enemies
+from src.pathing import new_path
+
+
+# entities on the floor by tile, so finding what is on a tile doesn't scan every entity
+class EntityIndex:
+    def __init__(self):
+        self.cells = {}  # (x, y) -> entities on the tile, in the order they arrived
+
+    def add(self, entity):
+        if entity.x is not None:
+            self.cells.setdefault((entity.x, entity.y), []).append(entity)
+
+    def remove(self, entity):
+        if entity.x is not None:
+            entities = self.cells[(entity.x, entity.y)]
+            entities.remove(entity)
+            if not entities:
+                del self.cells[(entity.x, entity.y)]
+
+    def move(self, entity, x, y):
+        self.remove(entity)
+        entity.x = x
+        entity.y = y
+        self.add(entity)
+
+    def at(self, x, y):
+        return self.cells.get((x, y), ())
+
+    def is_blocked(self, x, y):
+        for entity in self.at(x, y):
+            if entity.blocks_movement:
+                return True
+        return False
+
+
+# entities drawn in the light of the floor, shaded together in one batch each frame
+class Renderables:
+    OFF_FLOOR = -1  # x and y of free slots and of entities taken off the floor
+
+    def __init__(self):
+        # one slot per entity, its position is kept in the arrays by Entity.place so drawing can
+        # find what is on screen without touching the entities
+        self.entities = []  # entity in each slot, None if the slot is free
+        self.slots = {}  # entity -> slot
+        self.free = []
+        self.xs = numpy.full(64, self.OFF_FLOOR, dtype=numpy.int32)
+        self.ys = numpy.full(64, self.OFF_FLOOR, dtype=numpy.int32)
+        # when each entity was added, where entities share a tile the earliest is drawn on top
+        self.orders = numpy.zeros(64, dtype=numpy.int64)
+        self.order = itertools.count()
+
+    def add(self, entity):
+        if self.free:
+            slot = self.free.pop()
+            self.entities[slot] = entity
+        else:
+            slot = len(self.entities)
+            self.entities.append(entity)
+            if slot == len(self.xs):
+                self.xs = numpy.concatenate((self.xs, numpy.full(slot, self.OFF_FLOOR, dtype=numpy.int32)))
+                self.ys = numpy.concatenate((self.ys, numpy.full(slot, self.OFF_FLOOR, dtype=numpy.int32)))
+                self.orders = numpy.concatenate((self.orders, numpy.zeros(slot, dtype=numpy.int64)))
+        self.slots[entity] = slot
+        self.orders[slot] = next(self.order)
+        self.move(entity)
+
+    def remove(self, entity):
+        slot = self.slots.pop(entity, None)
+        if slot is not None:
+            self.entities[slot] = None
+            self.xs[slot] = self.OFF_FLOOR
+            self.ys[slot] = self.OFF_FLOOR
+            self.free.append(slot)
+
+    def move(self, entity):
+        # called after the entity's position changed
+        slot = self.slots.get(entity)
+        if slot is not None:
+            self.xs[slot] = self.OFF_FLOOR if entity.x is None else entity.x
+            self.ys[slot] = self.OFF_FLOOR if entity.y is None else entity.y
+
+    def draw(self, con, seen, top_left, bottom_right, light_map):
+        # seen is the [x, y] mask of what the player sees
+        count = len(self.entities)
+        xs = self.xs[:count]
+        ys = self.ys[:count]
+        slots = numpy.flatnonzero((xs >= top_left[0]) & (xs < bottom_right[0]) &
+                                  (ys >= top_left[1]) & (ys < bottom_right[1]))
+        brightness = light_map.brightness_of(xs[slots], ys[slots])
+        lit = seen[xs[slots], ys[slots]] & (brightness > 0)
+        slots = slots[lit]
+        brightness = brightness[lit]
+
+        # only a few entities are ever in sight, the rest is done for those alone
+        on_top = {}
+        for i in numpy.argsort(self.orders[slots], kind='stable').tolist():
+            on_top.setdefault((int(xs[slots[i]]), int(ys[slots[i]])), i)
+        if not on_top:
+            return
+        shown = numpy.array(list(on_top.values()), dtype=numpy.intp)
+        slots = slots[shown]
+        entities = [self.entities[slot] for slot in slots.tolist()]
+        colors = numpy.array([Light.color_table(darkest_sepia, entity.color)[step]
+                              for entity, step in zip(entities, Light.color_steps(brightness[shown]).tolist())],
+                             dtype=numpy.float32)
+        colors = (colors * light_map.tint_of(xs[slots], ys[slots])).astype(numpy.uint8)
+        chars = numpy.array([ord(entity.char) for entity in entities], dtype=numpy.int32)
+        con.put_chars(xs[slots] - top_left[0], ys[slots] - top_left[1], chars, colors)
+
+
+# entities are the player, objects, items and enemies,
+# light and noise are None for entities that don't give off any
 class Entity:
+    is_reusable = False  # whether destroyed entities of the class are kept to be reset and reused
+    is_renderable = True  # whether the entity is drawn with Renderables
+    __slots__ = ('x', 'y', 'char', 'color', 'con', 'game', 'blocks_movement', 'light', 'noise', 'entity_fov_map',
+                 'fov', 'fov_key')
+
     def __init__(self, x, y, char, color, blocks_movement, light, noise, entity_fov_map, con, game):
         self.x = x
         self.y = y
@@ -19,12 +150,14 @@ class Entity:
         self.light = light
         self.noise = noise
         self.entity_fov_map = entity_fov_map
+        # [x, y] mask of the cells seen after the last compute_fov, and (map, x, y, sight range, map version) it is for
+        self.fov = None
+        self.fov_key = None
 
     def move(self, dx, dy, tiles):
         has_moved = False
         if tiles[self.x + dx][self.y + dy].is_walkable and self.check_is_walkable(self.x + dx, self.y + dy):
-            self.x += dx
-            self.y += dy
+            self.place(self.x + dx, self.y + dy)
             has_moved = True
         return has_moved
 
@@ -37,30 +170,39 @@ class Entity:
     def collect(self, player):
         return
 
-    def check_is_walkable(self, x, y):
-        for entity in self.game.entities:
-            if entity.x == x and entity.y == y:
-                return not entity.blocks_movement
-        return True
+    def reset(self, x, y, fov_map):
+        # makes a destroyed entity as good as new at (x, y)
+        self.x = x
+        self.y = y
+        self.entity_fov_map = fov_map
+        self.fov = None
+        self.fov_key = None
 
-    def draw(self, fov_map, top_left, bottom_right, tiles):
-        if libtcod.map_is_in_fov(fov_map, self.x, self.y) and tiles[self.x][self.y].brightness > 0:
-            color = Light.calculate_tile_color(tiles[self.x][self.y].brightness,
-                                               libtcod.darkest_sepia, self.color)
-            screen_x, screen_y = self.screen_xy(self, top_left, bottom_right, self.x, self.y)
-            libtcod.console_set_default_foreground(self.con, color)
-            libtcod.console_put_char(self.con, screen_x, screen_y, self.char, libtcod.BKGND_NONE)
+    def place(self, x, y):
+        # every change of position goes through here to keep the game's entity index and renderables up to date,
+        # None takes the entity off the floor
+        self.game.entity_index.move(self, x, y)
+        self.game.renderables.move(self)
 
-    def compute_fov(self, sight_range):
-        libtcod.map_compute_fov(self.entity_fov_map,
-                                self.x,
-                                self.y,
-                                sight_range,
-                                True,
-                                libtcod.FOV_RESTRICTIVE)
+    def check_is_walkable(self, x, y):
+        return not self.game.entity_index.is_blocked(x, y)
 
-    def clear(self):
-        libtcod.console_put_char(self.con, self.x, self.y, ' ', libtcod.BKGND_NONE)
+    def compute_fov(self, sight_range):
+        # returns the cells the entity sees, skipped when nothing that affects them has changed since the last call
+        key = (self.entity_fov_map, self.x, self.y, sight_range, self.game.level.map_version)
+        if key == self.fov_key:
+            self.game.profiler.count('fov_hits')
+            return self.fov
+        self.game.profiler.count('fov_misses')
+        self.fov = compute_fov(self.entity_fov_map,
+                               self.game.level.tiles.transparent,
+                               self.x,
+                               self.y,
+                               sight_range,
+                               True,
+                               FOV_RESTRICTIVE)
+        self.fov_key = key
+        return self.fov
 
     def tile_distance(self, x, y):
         distance = math.fabs(self.x - x) + math.fabs(self.y - y)
@@ -86,11 +228,13 @@ class NextAction:
 class Player(Entity):
     BASE_SIGHT_RANGE = 15
     class_char = '@'
-    class_color = libtcod.white
+    class_color = white
+    __slots__ = ('sanity', 'health', 'stamina', 'fuel', 'lamp_range', 'is_lamp_on', 'sight_range', 'performing_action',
+                 'next_action', 'is_moving_entity', 'grabbed_entity', 'is_sneaking')
 
     def __init__(self, x, y, fov_map, con, game):
         Entity.__init__(self, x, y, self.class_char, self.class_color, True,
-                        Light(10, fov_map, con, game), Noise(x, y, 0, con, game), fov_map, con, game)
+                        Light(10, con, game), Noise(x, y, 0, con, game), fov_map, con, game)
 
         # player stats
         self.sanity = 100.0  # sanity in %
@@ -129,20 +273,17 @@ class Player(Entity):
     def perform_action(self, x, y):
         self.performing_action = False
         if self.next_action == NextAction.generic:
-            for entity in self.game.entities:
-                if self.x + x == entity.x and self.y + y == entity.y:
-                    entity.action()
-                    return
+            for entity in self.game.entity_index.at(self.x + x, self.y + y):
+                entity.action()
+                return
         elif self.next_action == NextAction.grab:
-            for entity in self.game.entities:
-                if self.x + x == entity.x and self.y + y == entity.y:
-                    self.grab_entity(entity)
-                    return
+            for entity in self.game.entity_index.at(self.x + x, self.y + y):
+                self.grab_entity(entity)
+                return
         elif self.next_action == NextAction.collect:
-            for entity in self.game.entities:
-                if self.x + x == entity.x and self.y + y == entity.y:
-                    entity.collect(self)
-                    return
+            for entity in self.game.entity_index.at(self.x + x, self.y + y):
+                entity.collect(self)
+                return
 
     def grab_entity(self, entity):
         if entity.grab():
@@ -159,8 +300,7 @@ class Player(Entity):
                 self.check_is_walkable(self.x + dx, self.y + dy):
             if self.is_moving_entity:
                 if self.stamina >= 15:
-                    self.grabbed_entity.x = self.x
-                    self.grabbed_entity.y = self.y
+                    self.grabbed_entity.place(self.x, self.y)
                     self.stamina -= 10
                 else:
                     self.drop()
@@ -170,13 +310,12 @@ class Player(Entity):
             else:
                 self.is_sneaking = False
                 self.noise.volume += 18
-            self.x += dx
-            self.y += dy
+            self.place(self.x + dx, self.y + dy)
             self.stamina -= 5
             has_moved = True
         return has_moved
 
-    def update(self, tiles):
+    def update(self, light_map):
         # fuel
         if self.is_lamp_on and self.fuel >= 0:
             if self.game.turn_based:
@@ -199,16 +338,17 @@ class Player(Entity):
             self.light.brightness = 2 + self.lamp_range
 
         # sanity
-        if tiles[self.x][self.y].brightness > 2:
+        brightness = light_map.brightness_at(self.x, self.y)
+        if brightness > 2:
             if self.game.turn_based:
                 self.sanity += 0.2
             else:
                 self.sanity += 0.02
         else:
             if self.game.turn_based:
-                self.sanity -= (3 - tiles[self.x][self.y].brightness) / 2
+                self.sanity -= (3 - brightness) / 2
             else:
-                self.sanity -= (3 - tiles[self.x][self.y].brightness) / 15
+                self.sanity -= (3 - brightness) / 15
 
         if self.sanity > 100:
             self.sanity = 100
@@ -238,17 +378,19 @@ class Player(Entity):
 
 class Monster(Entity):
     SPAWN_DISTANCE = 12
+    MAX_PATH_TAIL = 3  # steps a path can be extended by before it is computed again
+    is_renderable = False  # drawn unshaded over everything else, see draw
     class_char = '&'
-    class_color = libtcod.red
+    class_color = red
+    __slots__ = ('is_spawned', 'spawn_delay', 'spawn_frame', 'move_speed', 'player', 'chasing_player', 'last_known',
+                 'level', 'fov_map', 'path', 'path_version', 'path_tail', 'waypoints')
 
     def __init__(self, x, y, level, player, fov_map, con, game):
-        Entity.__init__(self, x, y, self.class_char, self.class_color, True,
-                        Light(0, fov_map, con, game), Noise(x, y, 0, con, game), fov_map, con, game)
-        # spawning and timing
+        Entity.__init__(self, x, y, self.class_char, self.class_color, True, None, None, fov_map, con, game)
+        # spawning and timing, in frames counted by the MonsterScheduler
         self.is_spawned = False
-        self.monster_timer = libtcod.random_get_int(0, 30, 100)
-        self.monster_index = 0
-        self.move_index = 0
+        self.spawn_delay = random_int(30, 100)
+        self.spawn_frame = 0
 
         # moving
         self.move_speed = 8  # in frames, lower is faster
@@ -256,139 +398,190 @@ class Monster(Entity):
         # player
         self.player = player
         self.chasing_player = False
+        self.last_known = None  # where the player was last seen or heard, None once the monster lost them
 
         # level
         self.level = level
         self.fov_map = level.fov_map
-        self.path = libtcod.path_new_using_map(self.fov_map, 0.0)
-        self.noise_path = libtcod.path_new_using_map(self.fov_map, 0.0)
-
-    def spawn(self, player, tiles):
-        valid_spawns = []
-        for dx in range(0 - self.SPAWN_DISTANCE, self.SPAWN_DISTANCE):
-            dy = self.SPAWN_DISTANCE - math.fabs(dx)
-            x = int(dx + player.x)
-            y = int(dy + player.y)
-
-            if 0 <= x < len(tiles) and 0 <= y < len(tiles[0]) and tiles[x][y].is_walkable:
-                valid_spawns.append(tiles[x][y])
-
-            y = int((0 - dy) + player.y)
-            if 0 <= x < len(tiles) and 0 <= y < len(tiles[0]) and tiles[x][y].is_walkable:
-                valid_spawns.append(tiles[x][y])
-
-        if len(valid_spawns):
-            spawn_tile = valid_spawns[libtcod.random_get_int(0, 0, len(valid_spawns) - 1)]
-            self.x = spawn_tile.x
-            self.y = spawn_tile.y
+        self.path = new_path(self.fov_map, level.tiles.walkable)
+        self.path_version = None  # map version the path was computed on
+        self.path_tail = []  # steps walked after the path, added when its goal moved by one tile
+        self.waypoints = []  # room centers still to visit on a long trip, the last one is where it ends
+
+    def spawn(self, player):
+        # picks one of the spawn candidates around the player, weighted by how directly it can reach them
+        xs, ys, weights = self.level.spawn_candidates(player.x, player.y, self.SPAWN_DISTANCE,
+                                                      self.player_distances(), self.game.entity_index)
+        if len(xs):
+            total = numpy.cumsum(weights)
+            pick = min(int(numpy.searchsorted(total, random_float(0, total[-1]), side='right')),
+                       len(xs) - 1)
+            self.x = int(xs[pick])
+            self.y = int(ys[pick])
+            self.game.add_entity(self)
             self.is_spawned = True
-            libtcod.path_compute(self.path, self.x, self.y, player.x, player.y)
+            self.last_known = (player.x, player.y)
+
+    def delete(self):
+        # frees the path, call before the level it was made from is deleted
+        self.path.delete()
 
     def despawn(self):
         self.is_spawned = False
-        self.x = None
-        self.y = None
+        self.last_known = None
+        self.game.despawn_entity(self)
         self.game.turn_based = True
 
+    def player_distances(self):
+        # the distance field to the player, only recomputed when the player moved or the map changed
+        field = self.level.player_distances
+        if field.update(self.player.x, self.player.y, self.level.map_version):
+            self.game.profiler.count('field_updates')
+        return field
+
     def check_hear_player(self):
-        libtcod.path_compute(self.noise_path, self.x, self.y, self.player.x, self.player.y)
-        can_hear_player = False
-        if self.player.noise.volume > libtcod.path_size(self.noise_path):
-            libtcod.path_compute(self.path, self.x, self.y, self.player.x, self.player.y)
-            can_hear_player = True
-        return can_hear_player
-
-    def check_see_player(self, tiles):
-        self.compute_monster_fov()
-
-        if self.game.turn_based or libtcod.map_is_in_fov(self.fov_map, self.player.x, self.player.y) \
-                and tiles[self.player.x][self.player.y].brightness > 3:
+        return self.level.sounds.loudness_at(self.player.x, self.player.y, self.player.noise.volume,
+                                             self.x, self.y) > 0
+
+    def check_see_player(self, light_map, sight):
+        # sight is the [x, y] mask of tiles the player can be seen from, shared by all monsters
+        if self.game.turn_based or sight[self.x, self.y] \
+                and light_map.brightness_at(self.player.x, self.player.y) > 3:
             can_see_player = True
             self.move_speed = 5  # lower is faster
-            libtcod.path_compute(self.path, self.x, self.y, self.player.x, self.player.y)
         else:
             can_see_player = False
             self.move_speed = 8
 
         return can_see_player
 
-    def compute_monster_fov(self):
-        # compute fov of an entity
-        libtcod.map_compute_fov(self.fov_map,
-                                self.x,
-                                self.y,
-                                25,
-                                True,
-                                libtcod.FOV_RESTRICTIVE)
+    def path_is_empty(self):
+        return self.path.is_empty() and not self.path_tail
+
+    def path_destination(self):
+        if self.path_tail:
+            return self.path_tail[-1]
+        return self.path.destination()
+
+    def compute_path(self, x, y):
+        # keeps the current path if it still leads from the monster to (x, y) on the same map,
+        # extends it by a step if (x, y) is next to where it leads, and only computes a new one otherwise
+        profiler = self.game.profiler
+        if self.path_version == self.level.map_version and not self.path_is_empty():
+            destination = self.path_destination()
+            on_path = self.path.is_empty() or self.path.origin() == (self.x, self.y)
+            if on_path and destination == (x, y):
+                profiler.count('path_hits')
+                return
+            if on_path and len(self.path_tail) < self.MAX_PATH_TAIL and self.level.tiles.walkable[x, y] \
+                    and abs(destination[0] - x) + abs(destination[1] - y) == 1:
+                self.path_tail.append((x, y))
+                profiler.count('path_repairs')
+                return
+
+        self.path.compute(self.x, self.y, x, y)
+        self.path_version = self.level.map_version
+        self.path_tail = []
+        profiler.count('path_computes')
+        profiler.count('path_steps', self.path.size())
+
+    def travel_to(self, x, y):
+        # plans the trip room by room and paths to the first stop, the rest are pathed as they are reached
+        self.waypoints = self.level.room_graph.waypoints(self.x, self.y, x, y)
+        self.compute_path(*self.waypoints.pop(0))
 
     def monster_action(self):
-        if libtcod.path_is_empty(self.path):
-            ox, oy = self.level.rooms[libtcod.random_get_int(0, 0, len(self.level.rooms) - 1)].center()
-            libtcod.path_compute(self.path, self.x, self.y, ox, oy)
+        if self.last_known is not None:
+            # the player was noticed this frame, follow the distance field straight to them
+            step = self.player_distances().next_step(self.x, self.y)
+            if step is None:
+                return
+        elif self.path_is_empty():
+            if self.waypoints:
+                self.compute_path(*self.waypoints.pop(0))
+            else:
+                self.travel_to(*self.level.rooms[random_int(0, len(self.level.rooms) - 1)].center())
+            return
         else:
-            x, y = libtcod.path_get(self.path, 0)
-            if self.player.x == x and self.player.y == y:
-                self.player.health -= 10
+            if self.path_version != self.level.map_version:
+                # the map changed under the path, recomputed here instead of on every walk
+                self.compute_path(*self.path_destination())
+                if self.path_is_empty():
+                    return
+            if self.path.is_empty():
+                step = self.path_tail[0]
             else:
-                can_move = True
-                for entity in self.game.entities:
-                    if entity.blocks_movement and x == entity.x and y == entity.y and \
-                            (entity.char == Door.closed_char or entity.char == Closet.class_char):
-                        entity.bash()
-                        can_move = False
-                if can_move:
-                    x, y = libtcod.path_walk(self.path, True)
-                    dx = x - self.x
-                    dy = y - self.y
-                    self.move(dx, dy, self.level.tiles)
-
-    def draw(self, fov_map, top_left, bottom_right, tiles):
-        if self.is_spawned and libtcod.map_is_in_fov(self.fov_map, self.x, self.y) and tiles[self.x][self.y].brightness > 0:
+                step = self.path.next_step()
+
+        x, y = step
+        if self.player.x == x and self.player.y == y:
+            self.player.health -= 10
+        else:
+            can_move = True
+            for entity in list(self.game.entity_index.at(x, y)):
+                if entity.blocks_movement and (entity.char == Door.closed_char or entity.char == Closet.class_char):
+                    entity.bash()
+                    can_move = False
+            # the path only advances once the monster has actually stepped onto it
+            if can_move and self.move(x - self.x, y - self.y, self.level.tiles):
+                if self.last_known is None and self.path.is_empty():
+                    self.path_tail.pop(0)
+                elif self.last_known is None:
+                    self.path.walk()
+            elif can_move and self.last_known is None:
+                # something that can't be bashed is in the way, give up and pick somewhere else
+                self.path.compute(self.x, self.y, self.x, self.y)
+                self.path_tail = []
+                self.waypoints = []
+
+    def draw(self, seen, top_left, bottom_right, light_map):
+        if self.is_spawned and seen[self.x, self.y] and light_map.brightness_at(self.x, self.y) > 0:
             # set the game to real time when the player sees the monster
             if self.game.turn_based:
                 self.game.turn_based = False
             screen_x, screen_y = self.screen_xy(self, top_left, bottom_right, self.x, self.y)
-            libtcod.console_set_default_foreground(self.con, self.color)
-            libtcod.console_put_char(self.con, screen_x, screen_y, self.char, libtcod.BKGND_NONE)
-
-    def update(self, tiles):
-        self.move_index += 1
-        self.monster_index += 1
+            self.con.put_char(screen_x, screen_y, self.char, self.color)
 
-        if self.is_spawned and (self.check_see_player(tiles) or self.check_hear_player()):
+    def perceive(self, light_map, sight):
+        # runs every frame the monster is spawned
+        if self.check_see_player(light_map, sight) or self.check_hear_player():
             self.chasing_player = True
-        elif self.is_spawned and libtcod.path_is_empty(self.path):
+            self.last_known = (self.player.x, self.player.y)
+        elif self.last_known is not None:
+            # lost the player, search where they were last noticed
+            self.travel_to(self.last_known[0], self.last_known[1])
+            self.last_known = None
+        elif self.path_is_empty() and not self.waypoints:
             self.chasing_player = False
 
-        if self.is_spawned and not self.chasing_player \
-                and self.tile_distance(self.player.x, self.player.y) > 15 and self.monster_index > 250:
-            self.despawn()
-            self.monster_index = 0
-            self.monster_timer = libtcod.random_get_int(0, 100, 150)
-
-        elif self.monster_index > self.monster_timer and not self.is_spawned:
-            self.monster_index = 0
-            self.monster_timer = self.move_speed
-            self.spawn(self.player, self.level.tiles)
+    def act(self, frame):
+        # runs when the monster is due, returns the number of frames until it is due again
+        if not self.is_spawned:
+            # tries again soon if there was nowhere to spawn
+            self.spawn(self.player)
+            self.spawn_frame = frame
+            return self.move_speed + 1
 
-        elif self.is_spawned and not self.game.turn_based and self.move_index > self.move_speed:
-            self.move_index = 0
-            self.monster_action()
+        if not self.chasing_player and self.tile_distance(self.player.x, self.player.y) > 15 \
+                and frame - self.spawn_frame > 250:
+            self.despawn()
+            return random_int(100, 150)
 
-        elif self.is_spawned and self.game.turn_based:
-            self.move_index = 0
-            self.monster_action()
+        self.monster_action()
+        if self.game.turn_based:
+            return 1
+        return self.move_speed + 1
 
 
 class Door(Entity):
     BASE_STRENGTH = 3
     closed_char = "+"
     open_char = "-"
-    class_color = libtcod.light_gray
+    class_color = light_gray
+    __slots__ = ('is_open', 'strength', 'level')
 
     def __init__(self, x, y, level, fov_map, con, game, is_open=False):
-        Entity.__init__(self, x, y, self.closed_char, self.class_color, True,
-                        Light(0, fov_map, con, game), Noise(x, y, 0, con, None), fov_map, con, game)
+        Entity.__init__(self, x, y, self.closed_char, self.class_color, True, None, None, fov_map, con, game)
 
         self.is_open = is_open
         self.strength = self.BASE_STRENGTH
@@ -400,39 +593,42 @@ class Door(Entity):
             self.close()
         else:
             self.open()
-        self.level.create_fov_maps()
 
     def open(self):
         self.is_open = True
         self.blocks_movement = False
         self.char = self.open_char
-        self.level.tiles[self.x][self.y].is_transparent = True
+        self.level.set_tile(self.x, self.y, is_transparent=True)
 
     def close(self):
         self.is_open = False
         self.blocks_movement = True
         self.char = self.closed_char
         self.strength = self.BASE_STRENGTH
-        self.level.tiles[self.x][self.y].is_transparent = False
+        self.level.set_tile(self.x, self.y, is_transparent=False)
 
     def bash(self):
         self.strength -= 1
         if self.strength <= 0:
             self.open()
-            self.level.create_fov_maps()
 
 
 class Fuel(Entity):
+    is_reusable = True
     class_char = "*"
-    class_color = libtcod.amber
+    class_color = amber
+    __slots__ = ('amount',)
 
     def __init__(self, x, y, fov_map, con, game):
-        Entity.__init__(self, x, y, self.class_char, self.class_color, False, Light(0, fov_map, con, game), Noise(x, y, 0, con, None), fov_map, con, game)
-        self.amount = libtcod.random_get_int(0, 5, 15)
+        Entity.__init__(self, x, y, self.class_char, self.class_color, False, None, None, fov_map, con, game)
+        self.amount = random_int(5, 15)
+
+    def reset(self, x, y, fov_map):
+        Entity.reset(self, x, y, fov_map)
+        self.amount = random_int(5, 15)
 
     def collect(self, player):
-        self.x = None
-        self.y = None
+        self.game.destroy_entity(self)
         player.fuel += self.amount
         if player.fuel > 100:
             player.fuel = 100
@@ -440,11 +636,11 @@ class Fuel(Entity):
 
 class Stairs(Entity):
     class_char = "s"
-    class_color = libtcod.light_green
+    class_color = light_green
+    __slots__ = ()
 
     def __init__(self, x, y, fov_map, con, game):
-        Entity.__init__(self, x, y, self.class_char, self.class_color, False,
-                        Light(0, fov_map, con, game), Noise(x, y, 0, con, game), fov_map, con, game)
+        Entity.__init__(self, x, y, self.class_char, self.class_color, False, None, None, fov_map, con, game)
         self.game = game
 
     def action(self):
@@ -453,16 +649,16 @@ class Stairs(Entity):
 
 class Closet(Entity):
     class_char = "c"
-    class_color = libtcod.azure
+    class_color = azure
     BASE_STRENGTH = 5
+    __slots__ = ('strength', 'is_destroyed', 'destroyed_color', 'hiding_color')
 
     def __init__(self, x, y, fov_map, con, game):
-        Entity.__init__(self, x, y, self.class_char, libtcod.azure, True,
-                        Light(0, fov_map, con, game), Noise(x, y, 0, con, game), fov_map, con, game)
+        Entity.__init__(self, x, y, self.class_char, azure, True, None, None, fov_map, con, game)
         self.strength = self.BASE_STRENGTH
         self.is_destroyed = False
-        self.destroyed_color = libtcod.darker_azure
-        self.hiding_color = libtcod.light_azure
+        self.destroyed_color = darker_azure
+        self.hiding_color = light_azure
 
     def action(self):
         return
@@ -487,17 +683,21 @@ class Closet(Entity):
 
 class Torch(Entity):
     class_char = 't'
-    lit_color = libtcod.orange
-    unlit_color = libtcod.darker_orange
+    lit_color = orange
+    unlit_color = darker_orange
+    light_color = lighter_orange
+    __slots__ = ('lit_brightness', 'is_lit')
 
     def __init__(self, x, y, is_lit, fov_map, con, game):
-        self.lit_brightness = libtcod.random_get_int(0, 4, 8)
+        self.lit_brightness = random_int(4, 8)
         if is_lit:
             Entity.__init__(self, x, y, self.class_char, self.lit_color, False,
-                            Light(self.lit_brightness, fov_map, con, game), Noise(x, y, 0, con, game), fov_map, con, None)
+                            Light(self.lit_brightness, con, game, True, self.light_color), None,
+                            fov_map, con, None)
         else:
             Entity.__init__(self, x, y, self.class_char, self.unlit_color, False,
-                            Light(self.lit_brightness, fov_map, con, game), Noise(x, y, 0, con, game), fov_map, con, None)
+                            Light(self.lit_brightness, con, game, True, self.light_color), None,
+                            fov_map, con, None)
         self.is_lit = is_lit
 
     def action(self):
@@ -508,4 +708,5 @@ class Torch(Entity):
         else:
             self.is_lit = True
             self.color = self.lit_color
-            self.light.brightness = self.lit_brightness
\ No newline at end of file
+            self.light.brightness = self.lit_brightness
+        self.light.invalidate()
\ No newline at end of file
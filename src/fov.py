@@ -0,0 +1,167 @@
+# !usr/bin/python
+
+import ctypes
+import numpy
+from src.native import libtcod
+
+# libtcod's fov algorithms, the values match its FOV_* constants so they can be passed to it as they are
+FOV_BASIC = 0
+FOV_SHADOW = 2
+FOV_RESTRICTIVE = 12
+
+
+# layout of a native TCOD_map_t, each cell packs transparent (bit 0), walkable (bit 1) and fov (bit 2)
+class _CMap(ctypes.Structure):
+    _fields_ = [('width', ctypes.c_int),
+                ('height', ctypes.c_int),
+                ('nbcells', ctypes.c_int),
+                ('cells', ctypes.POINTER(ctypes.c_uint8))]
+
+
+CELL_TRANSPARENT = 1
+CELL_WALKABLE = 2
+CELL_FOV = 4
+
+
+def fov_cells(fov_map):
+    # numpy view of the native cell array, indexed [x, y] like Level.tiles
+    c_map = ctypes.cast(fov_map, ctypes.POINTER(_CMap)).contents
+    cells = numpy.ctypeslib.as_array(c_map.cells, shape=(c_map.height, c_map.width))
+    return cells.T
+
+
+def check_native_layout():
+    # fov_cells reads libtcod's private map struct, which other libtcod versions lay out differently,
+    # so a few known cells are set through the library and must read back the same through fov_cells
+    width, height = 3, 2
+    fov_map = libtcod.map_new(width, height)
+    try:
+        libtcod.map_set_properties(fov_map, 1, 1, True, True)
+        libtcod.map_set_properties(fov_map, 2, 1, True, False)
+        libtcod.map_set_properties(fov_map, 2, 0, False, True)
+        libtcod.map_compute_fov(fov_map, 1, 1, 0, True, FOV_BASIC)
+        c_map = ctypes.cast(fov_map, ctypes.POINTER(_CMap)).contents
+        matches = (c_map.width, c_map.height, c_map.nbcells) == (width, height, width * height)
+        if matches:
+            cells = fov_cells(fov_map)
+            for x in range(width):
+                for y in range(height):
+                    expected = (libtcod.map_is_transparent(fov_map, x, y) * CELL_TRANSPARENT |
+                                libtcod.map_is_walkable(fov_map, x, y) * CELL_WALKABLE |
+                                libtcod.map_is_in_fov(fov_map, x, y) * CELL_FOV)
+                    matches = matches and cells[x, y] == expected
+    finally:
+        libtcod.map_delete(fov_map)
+    if not matches:
+        raise RuntimeError('this libtcod build lays out its fov maps differently than src.fov expects')
+
+
+def set_fov_properties(fov_map, transparent, walkable):
+    # writes whole [x, y] transparent and walkable arrays into the native map, clearing its fov
+    fov_cells(fov_map)[:] = transparent * CELL_TRANSPARENT | walkable * CELL_WALKABLE
+
+
+def native_map_bytes(width, height):
+    # size of a TCOD_map_t and its cell array
+    return ctypes.sizeof(_CMap) + width * height
+
+
+# (a, b, c, d) turning a quadrant's (depth, column) into the offset (a * depth + b * col, c * depth + d * col)
+QUADRANTS = ((0, 1, -1, 0), (0, 1, 1, 0), (1, 0, 0, 1), (-1, 0, 0, 1))
+
+
+def shadowcast(transparent, x, y, radius, light_walls=True):
+    # symmetric shadowcasting from (x, y) over an [x, y] transparency array, returns an [x, y] visibility mask,
+    # a radius of 0 or less is unlimited
+    width, height = transparent.shape
+    if radius <= 0:
+        radius = max(width, height)
+    x0 = max(0, x - radius)
+    y0 = max(0, y - radius)
+    x1 = min(width, x + radius + 1)
+    y1 = min(height, y + radius + 1)
+    w = x1 - x0
+    h = y1 - y0
+    ox = x - x0
+    oy = y - y0
+    radius_squared = radius * radius
+
+    # python lists are much faster than numpy for one cell at a time
+    grid = transparent[x0:x1, y0:y1].tolist()
+    visible = [[False] * h for _ in range(w)]
+    visible[ox][oy] = True
+
+    for a, b, c, d in QUADRANTS:
+        # rows left to scan as (depth, start slope, end slope), each slope a fraction n / m with m > 0
+        rows = [(1, -1, 1, 1, 1)]
+        while rows:
+            depth, start_n, start_m, end_n, end_m = rows.pop()
+            if depth > radius:
+                continue
+            # columns between the slopes, rounding ties towards the middle of the row
+            min_col = (2 * depth * start_n + start_m) // (2 * start_m)
+            max_col = -((end_m - 2 * depth * end_n) // (2 * end_m))
+            prev_wall = None
+            for col in range(min_col, max_col + 1):
+                tx = ox + a * depth + b * col
+                ty = oy + c * depth + d * col
+                inside = 0 <= tx < w and 0 <= ty < h
+                wall = not inside or not grid[tx][ty]
+                # floors are only seen when their center is between the slopes, which keeps fov symmetric
+                if inside and depth * depth + col * col <= radius_squared and (light_walls or not wall):
+                    if wall or (col * start_m >= depth * start_n and col * end_m <= depth * end_n):
+                        visible[tx][ty] = True
+                if prev_wall and not wall:
+                    start_n, start_m = 2 * col - 1, 2 * depth
+                if prev_wall is False and wall:
+                    rows.append((depth + 1, start_n, start_m, 2 * col - 1, 2 * depth))
+                prev_wall = wall
+            if prev_wall is False:
+                rows.append((depth + 1, start_n, start_m, end_n, end_m))
+
+    mask = numpy.zeros((width, height), dtype=bool)
+    mask[x0:x1, y0:y1] = visible
+    return mask
+
+
+# computes fov in the native map
+class LibtcodFov:
+    name = 'libtcod'
+
+    @staticmethod
+    def compute(fov_map, transparent, x, y, radius, light_walls, algorithm):
+        libtcod.map_compute_fov(fov_map, x, y, radius, light_walls, algorithm)
+        return (fov_cells(fov_map) & CELL_FOV) != 0
+
+
+# computes fov with shadowcast() from the transparency array alone, the native map and algorithm are ignored
+class ShadowcastFov:
+    name = 'shadowcast'
+
+    @staticmethod
+    def compute(fov_map, transparent, x, y, radius, light_walls, algorithm):
+        return shadowcast(transparent, x, y, radius, light_walls)
+
+
+# without libtcod there are no native maps, fov_map is None everywhere and only shadowcast can run
+if libtcod is None:
+    BACKENDS = {ShadowcastFov.name: ShadowcastFov}
+    backend = ShadowcastFov
+else:
+    BACKENDS = {backend.name: backend for backend in (LibtcodFov, ShadowcastFov)}
+    backend = LibtcodFov
+
+
+def use_backend(name):
+    global backend
+    if name not in BACKENDS:
+        raise ValueError('unknown or unavailable fov backend ' + repr(name) + ', expected one of ' +
+                         ', '.join(sorted(BACKENDS)))
+    backend = BACKENDS[name]
+
+
+def compute_fov(fov_map, transparent, x, y, radius, light_walls, algorithm):
+    # all fov goes through here so the backend can be swapped, returns an [x, y] mask of the cells seen from (x, y),
+    # fov_map is a native map built from the [x, y] transparent array, or None without libtcod,
+    # each backend only uses the one it needs
+    return backend.compute(fov_map, transparent, x, y, radius, light_walls, algorithm)
@@ -1,18 +1,34 @@
 # !usr/bin/python
 
+import itertools
 import math
-from lib import libtcodpy as libtcod
+import numpy
+from src.colors import Color
+from src.colors import darkest_sepia
+from src.colors import light_sepia
+from src.colors import lightest_sepia
 from src.entity import Door, Closet
 from src.entity import Fuel
 from src.entity import Stairs
 from src.entity import Torch
+from src.pathing import DistanceField
+from src.pathing import FovMapPool
 from src.pathing import Light
+from src.pathing import LightMap
+from src.pathing import RoomGraph
+from src.pathing import SoundMap
+from src.fov import native_map_bytes
+from src.fov import set_fov_properties
+from src.native import libtcod
+from src.native import random_int
 
 
 class Level:
     ROOM_MAX_SIZE = 10
     ROOM_MIN_SIZE = 4
     MAX_ROOMS = 30
+    LIGHT_MARGIN = 1  # lights this many tiles past the edge of the screen are still processed
+    map_versions = itertools.count()  # shared by all levels so a version never repeats across floors
 
     def __init__(self, width, height, con, game):
         self.width = width
@@ -20,23 +36,53 @@ class Level:
         self.con = con
 
         # tile colors
-        self.color_lit_floor = libtcod.light_sepia
-        self.color_lit_wall = libtcod.lightest_sepia
-        self.color_unlit_floor = libtcod.Color(25, 25, 25)
-        self.color_unlit_wall = libtcod.Color(25, 25, 25)
+        self.color_lit_floor = light_sepia
+        self.color_lit_wall = lightest_sepia
+        self.color_unlit_floor = Color(25, 25, 25)
+        self.color_unlit_wall = Color(25, 25, 25)
 
-        # fov map object
-        self.fov_map = libtcod.map_new(self.width, self.height)
-        self.monster_fov = libtcod.map_new(self.width, self.height)
+        # fov map object, None without libtcod where fov is computed from the tiles alone
+        self.fov_map = None
+        if libtcod is not None:
+            self.fov_map = libtcod.map_new(self.width, self.height)
+
+        # callbacks taking (x, y), called after set_tile changes a tile
+        self.tile_listeners = []
+        # changes whenever the fov maps change, caches compare against it
+        self.map_version = next(self.map_versions)
 
         # room list
         self.rooms = []
+        # how the rooms connect, built once the map is created
+        self.room_graph = None
+
+        # entities that emit light, in the order they are lit
+        self.light_sources = []
+
+        # tile grid, starts as solid wall
+        self.tiles = TileGrid(self.width, self.height)
+
+        # scratch fov maps for lights
+        self.fov_pool = FovMapPool(self.fov_map, self.tiles.transparent, self.width, self.height)
+
+        # native maps kept in sync with the tiles, as (map, transparent array, walkable array)
+        self.registered_fov_maps = []
+        if self.fov_map is not None:
+            self.registered_fov_maps.append((self.fov_map, self.tiles.transparent, self.tiles.walkable))
+
+        # steps to the player, shared by every monster on the floor
+        self.player_distances = DistanceField(self.tiles.walkable)
+
+        # how far sounds carry, kept for the last few places they were made
+        self.sounds = SoundMap(self.tiles.walkable, self.tiles.transparent)
+        self.tile_listeners.append(self.sounds.tile_changed)
+
+        # brightness of every tile, rebuilt by the lights each frame
+        self.light_map = LightMap(self.width, self.height)
+
+        # tiles the player has seen lit at least once
+        self.revealed = numpy.zeros((self.width, self.height), dtype=bool)
 
-        # tile list
-        self.tiles = [[Tile(False, x, y)
-                       for y in range(self.height)]
-                      for x in range(self.width)]
-        
         # screen
         self.top_left = [0, 0]
         self.bottom_right = [0, 0]
@@ -46,10 +92,10 @@ class Level:
 
         for r in range(self.MAX_ROOMS):
             # generate random dimensions
-            w = libtcod.random_get_int(0, self.ROOM_MIN_SIZE, self.ROOM_MAX_SIZE)
-            h = libtcod.random_get_int(0, self.ROOM_MIN_SIZE, self.ROOM_MAX_SIZE)
-            x = libtcod.random_get_int(0, 0, self.width - w - 1)
-            y = libtcod.random_get_int(0, 0, self.height - h - 1)
+            w = random_int(self.ROOM_MIN_SIZE, self.ROOM_MAX_SIZE)
+            h = random_int(self.ROOM_MIN_SIZE, self.ROOM_MAX_SIZE)
+            x = random_int(0, self.width - w - 1)
+            y = random_int(0, self.height - h - 1)
 
             new_room = Room(x, y, w, h)
 
@@ -66,12 +112,11 @@ class Level:
 
                 if number_of_rooms == 0:
                     # first room, place the player here
-                    player.x = new_room_x
-                    player.y = new_room_y
+                    player.place(new_room_x, new_room_y)
 
                 else:
                     # get a random existing room to run a hallway to
-                    (existing_x, existing_y) = self.rooms[libtcod.random_get_int(0, 0, number_of_rooms - 1)].center()
+                    (existing_x, existing_y) = self.rooms[random_int(0, number_of_rooms - 1)].center()
                     self.create_tunnel(new_room_x, new_room_y, existing_x, existing_y)
 
                 number_of_rooms += 1
@@ -85,151 +130,218 @@ class Level:
         self.add_items(game)
         self.add_stairs(game)
 
+        self.room_graph = RoomGraph(self.rooms, self.tiles.walkable)
+
         # create fov map
         self.create_fov_maps()
 
     def create_fov_maps(self):
-        for y in range(self.height):
-            for x in range(self.width):
-                libtcod.map_set_properties(self.fov_map, x, y,
-                                           self.tiles[x][y].is_transparent,
-                                           self.tiles[x][y].is_walkable)
-                libtcod.map_set_properties(self.monster_fov, x, y,
-                                           self.tiles[x][y].is_walkable,  # monster can see through doors
-                                           self.tiles[x][y].is_walkable)
+        for fov_map, transparent, walkable in self.registered_fov_maps:
+            set_fov_properties(fov_map, transparent, walkable)
+        self.map_version = next(self.map_versions)
+
+    def set_tile(self, x, y, is_walkable=None, is_transparent=None):
+        # changes one tile after the map is created, patching only that cell of the fov maps
+        if is_walkable is not None:
+            self.tiles.walkable[x, y] = is_walkable
+        if is_transparent is not None:
+            self.tiles.transparent[x, y] = is_transparent
+        for fov_map, transparent, walkable in self.registered_fov_maps:
+            libtcod.map_set_properties(fov_map, x, y, bool(transparent[x, y]), bool(walkable[x, y]))
+        self.map_version = next(self.map_versions)
+
+        self.invalidate_lights(x, y)
+        for listener in self.tile_listeners:
+            listener(x, y)
+
+    def add_light_source(self, entity):
+        self.light_sources.append(entity)
+
+    def remove_light_source(self, entity):
+        if entity in self.light_sources:
+            self.light_sources.remove(entity)
+
+    def visible_light_sources(self):
+        # light sources whose radius reaches the screen
+        left = self.top_left[0] - self.LIGHT_MARGIN
+        top = self.top_left[1] - self.LIGHT_MARGIN
+        right = self.bottom_right[0] + self.LIGHT_MARGIN
+        bottom = self.bottom_right[1] + self.LIGHT_MARGIN
+        visible = []
+        for entity in self.light_sources:
+            radius = entity.light.brightness
+            if radius > 0 and entity.x is not None and \
+                    entity.x + radius >= left and entity.x - radius < right and \
+                    entity.y + radius >= top and entity.y - radius < bottom:
+                visible.append(entity)
+        return visible
+
+    def invalidate_lights(self, x, y):
+        # called when the transparency of tile (x, y) changes
+        for entity in self.light_sources:
+            if entity.light.is_static:
+                entity.light.invalidate_tile(x, y)
+
+    def spawn_candidates(self, x, y, distance, field, entity_index):
+        # free walkable tiles exactly distance tiles from (x, y) that can walk to it, as x and y arrays with weights,
+        # field is a distance field to (x, y) and tiles it only reaches the long way round are less likely
+        x0 = max(0, x - distance)
+        y0 = max(0, y - distance)
+        x1 = min(self.width, x + distance + 1)
+        y1 = min(self.height, y + distance + 1)
+        ring = LightMap.distance_grid(x0, y0, x1, y1, x, y) == distance
+
+        walk = field.distances[x0:x1, y0:y1]
+        xs, ys = numpy.nonzero(ring & self.tiles.walkable[x0:x1, y0:y1] & (walk != field.UNREACHABLE))
+        # the ring is short, tiles held by a blocking entity are looked up one by one
+        free = numpy.array([not entity_index.is_blocked(cx, cy)
+                            for cx, cy in zip((xs + x0).tolist(), (ys + y0).tolist())], dtype=bool)
+        xs = xs[free]
+        ys = ys[free]
+        return xs + x0, ys + y0, distance / walk[xs, ys]
+
+    def native_memory_bytes(self):
+        # memory held by the native libtcod maps of this floor
+        if self.fov_map is None:
+            return 0
+        return native_map_bytes(self.width, self.height) + self.fov_pool.memory_bytes()
+
+    def delete(self):
+        # frees the native maps, the level can't be drawn after this
+        self.fov_pool.delete()
+        if self.fov_map is not None:
+            libtcod.map_delete(self.fov_map)
 
     def create_room(self, room):
         # sets the "wall" tiles of a room to be "floor" tiles
-        for x in range(room.x1 + 1, room.x2):
-            for y in range(room.y1 + 1, room.y2):
-                self.tiles[x][y].is_walkable = True
-                self.tiles[x][y].is_transparent = True
+        self.tiles.set_floor(slice(room.x1 + 1, room.x2), slice(room.y1 + 1, room.y2))
 
     def create_tunnel(self, start_x, start_y, end_x, end_y):
         # create a path from one point to another
         x_length = end_x - start_x
         y_length = end_y - start_y
+        x_span = slice(min(start_x, start_x + x_length), max(start_x, start_x + x_length) + 1)
+        y_span = slice(min(start_y, start_y + y_length), max(start_y, start_y + y_length) + 1)
 
         if x_length >= y_length:
-            for x in range(min(start_x, start_x + x_length), max(start_x, start_x + x_length) + 1):
-                self.tiles[x][start_y].is_walkable = True
-                self.tiles[x][start_y].is_transparent = True
-
-            for y in range(min(start_y, start_y + y_length), max(start_y, start_y + y_length) + 1):
-                self.tiles[end_x][y].is_walkable = True
-                self.tiles[end_x][y].is_transparent = True
+            self.tiles.set_floor(x_span, start_y)
+            self.tiles.set_floor(end_x, y_span)
 
         if y_length > x_length:
-            for y in range(min(start_y, start_y + y_length), max(start_y, start_y + y_length) + 1):
-                self.tiles[start_x][y].is_walkable = True
-                self.tiles[start_x][y].is_transparent = True
-
-            for x in range(min(start_x, start_x + x_length), max(start_x, start_x + x_length) + 1):
-                self.tiles[x][end_y].is_walkable = True
-                self.tiles[x][end_y].is_transparent = True
+            self.tiles.set_floor(start_x, y_span)
+            self.tiles.set_floor(x_span, end_y)
 
     def add_doors(self, room, game):
+        walkable = self.tiles.walkable
         for x in range(room.x1, room.x2):
             # top edge
-            if self.tiles[x][room.y1].is_walkable and self.num_adjacent_floors(x, room.y1) <= 2 \
-                    and not self.tiles[x + 1][room.y1].is_walkable and not self.tiles[x - 1][room.y1].is_walkable:
-                game.entities.append(Door(x, room.y1, self, self.fov_map, self.con, game))
+            if walkable[x, room.y1] and self.num_adjacent_floors(x, room.y1) <= 2 \
+                    and not walkable[x + 1, room.y1] and not walkable[x - 1, room.y1]:
+                game.add_entity(Door(x, room.y1, self, self.fov_map, self.con, game))
 
             # bottom edge
-            if self.tiles[x][room.y2].is_walkable and self.num_adjacent_floors(x, room.y2) <= 2 \
-                    and not self.tiles[x + 1][room.y2].is_walkable and not self.tiles[x - 1][room.y2].is_walkable:
-                game.entities.append(Door(x, room.y2, self, self.fov_map, self.con, game))
+            if walkable[x, room.y2] and self.num_adjacent_floors(x, room.y2) <= 2 \
+                    and not walkable[x + 1, room.y2] and not walkable[x - 1, room.y2]:
+                game.add_entity(Door(x, room.y2, self, self.fov_map, self.con, game))
 
         for y in range(room.y1, room.y2):
             # left edge
-            if self.tiles[room.x1][y].is_walkable and self.num_adjacent_floors(room.x1, y) <= 2 \
-                    and not self.tiles[room.x1][y + 1].is_walkable and not self.tiles[room.x1][y - 1].is_walkable:
-                game.entities.append(Door(room.x1, y, self, self.fov_map, self.con, game))
+            if walkable[room.x1, y] and self.num_adjacent_floors(room.x1, y) <= 2 \
+                    and not walkable[room.x1, y + 1] and not walkable[room.x1, y - 1]:
+                game.add_entity(Door(room.x1, y, self, self.fov_map, self.con, game))
 
             # right edge
-            if self.tiles[room.x2][y].is_walkable and self.num_adjacent_floors(room.x2, y) <= 2 \
-                    and not self.tiles[room.x2][y + 1].is_walkable and not self.tiles[room.x2][y - 1].is_walkable:
-                game.entities.append(Door(room.x2, y, self, self.fov_map, self.con, game))
+            if walkable[room.x2, y] and self.num_adjacent_floors(room.x2, y) <= 2 \
+                    and not walkable[room.x2, y + 1] and not walkable[room.x2, y - 1]:
+                game.add_entity(Door(room.x2, y, self, self.fov_map, self.con, game))
 
     def add_room_entities(self, room, game):
+        walkable = self.tiles.walkable
         # CLOSETS #
         odds = 50  # 1 in [odds] chance that an entity will spawn for every tile adjacent to a wall in a room
         for x in range(room.x1, room.x2):
             # top edge
-            if self.tiles[x][room.y1 + 1].is_walkable and self.num_adjacent_walls(x, room.y1 + 1) > 0 \
+            if walkable[x, room.y1 + 1] and self.num_adjacent_walls(x, room.y1 + 1) > 0 \
                     and self.will_spawn(odds):
-                game.entities.append(Closet(x, room.y1 + 1, self.fov_map, self.con, game))
+                game.add_entity(Closet(x, room.y1 + 1, self.fov_map, self.con, game))
 
             # bottom edge
-            if self.tiles[x][room.y2 - 1].is_walkable and self.num_adjacent_walls(x, room.y2 - 1) > 0 \
+            if walkable[x, room.y2 - 1] and self.num_adjacent_walls(x, room.y2 - 1) > 0 \
                     and self.will_spawn(odds):
-                game.entities.append(Closet(x, room.y2 - 1, self.fov_map, self.con, game))
+                game.add_entity(Closet(x, room.y2 - 1, self.fov_map, self.con, game))
 
         for y in range(room.y1, room.y2):
             # left edge
-            if self.tiles[room.x1 + 1][y].is_walkable and self.num_adjacent_walls(room.x1 + 1, y) > 0 \
+            if walkable[room.x1 + 1, y] and self.num_adjacent_walls(room.x1 + 1, y) > 0 \
                     and self.will_spawn(odds):
-                game.entities.append(Closet(room.x1 + 1, y, self.fov_map, self.con, game))
+                game.add_entity(Closet(room.x1 + 1, y, self.fov_map, self.con, game))
 
             # right edge
-            if self.tiles[room.x2 - 1][y].is_walkable and self.num_adjacent_walls(room.x2 - 1, y) > 0 \
+            if walkable[room.x2 - 1, y] and self.num_adjacent_walls(room.x2 - 1, y) > 0 \
                     and self.will_spawn(odds):
-                game.entities.append(Closet(room.x2 - 1, y, self.fov_map, self.con, game))
+                game.add_entity(Closet(room.x2 - 1, y, self.fov_map, self.con, game))
 
     def add_stairs(self, game):
+        walkable = self.tiles.walkable
         added = False
         while not added:
-            x = libtcod.random_get_int(0, 0, len(self.tiles) - 1)
-            y = libtcod.random_get_int(0, 0, len(self.tiles[0]) - 1)
-            if self.tiles[x][y].is_walkable:
-                game.entities.append(Stairs(x, y, self.fov_map, self.con, game))
+            x = random_int(0, self.width - 1)
+            y = random_int(0, self.height - 1)
+            if walkable[x, y]:
+                game.add_entity(Stairs(x, y, self.fov_map, self.con, game))
                 added = True
 
     def add_items(self, game):
+        walkable = self.tiles.walkable
         for i in range(30):
             while True:
-                x = libtcod.random_get_int(0, 0, len(self.tiles) - 1)
-                y = libtcod.random_get_int(0, 0, len(self.tiles[0]) - 1)
-                if self.tiles[x][y].is_walkable and self.num_adjacent_walls(x, y) > 0:
-                    game.entities.append(Torch(x, y, True, self.fov_map, self.con, game))
+                x = random_int(0, self.width - 1)
+                y = random_int(0, self.height - 1)
+                if walkable[x, y] and self.num_adjacent_walls(x, y) > 0:
+                    game.add_entity(Torch(x, y, True, self.fov_map, self.con, game))
                     break
 
         for i in range(20):
             while True:
-                x = libtcod.random_get_int(0, 0, len(self.tiles) - 1)
-                y = libtcod.random_get_int(0, 0, len(self.tiles[0]) - 1)
-                if self.tiles[x][y].is_walkable:
-                    game.entities.append(Fuel(x, y, self.fov_map, self.con, game))
+                x = random_int(0, self.width - 1)
+                y = random_int(0, self.height - 1)
+                if walkable[x, y]:
+                    fuel = game.reuse_entity(Fuel, x, y, self.fov_map)
+                    if fuel is None:
+                        fuel = Fuel(x, y, self.fov_map, self.con, game)
+                    game.add_entity(fuel)
                     break
 
     def num_adjacent_floors(self, x, y):
+        walkable = self.tiles.walkable
         adjacent_floors = 0
-        if self.tiles[x + 1][y].is_walkable:
+        if walkable[x + 1, y]:
             adjacent_floors += 1
-        if self.tiles[x][y + 1].is_walkable:
+        if walkable[x, y + 1]:
             adjacent_floors += 1
-        if self.tiles[x - 1][y].is_walkable:
+        if walkable[x - 1, y]:
             adjacent_floors += 1
-        if self.tiles[x][y - 1].is_walkable:
+        if walkable[x, y - 1]:
             adjacent_floors += 1
 
         return adjacent_floors
 
     def num_adjacent_walls(self, x, y):
+        walkable = self.tiles.walkable
         adjacent_walls = 0
-        if not self.tiles[x + 1][y].is_walkable:
+        if not walkable[x + 1, y]:
             adjacent_walls += 1
-        if not self.tiles[x][y + 1].is_walkable:
+        if not walkable[x, y + 1]:
             adjacent_walls += 1
-        if not self.tiles[x - 1][y].is_walkable:
+        if not walkable[x - 1, y]:
             adjacent_walls += 1
-        if not self.tiles[x][y - 1].is_walkable:
+        if not walkable[x, y - 1]:
             adjacent_walls += 1
 
         return adjacent_walls
 
     def draw(self, player, screen_width, screen_height):
-        player.compute_fov(player.sight_range)
+        seen = player.compute_fov(player.sight_range)
         self.top_left = [round(player.x - (screen_width - 1) / 2) - 1, round(player.y - (screen_height - 1) / 2) - 1]
         self.bottom_right = [round(player.x + (screen_width - 1) / 2), round(player.y + (screen_height - 1) / 2)]
 
@@ -249,45 +361,44 @@ class Level:
             self.top_left[1] = 0
             self.bottom_right[1] = screen_height
 
-        x_draw = 0
-        y_draw = 0
+        x0, y0 = self.top_left
+        x1, y1 = self.bottom_right
+        brightness = self.light_map.region(x0, y0, x1, y1)
+        walkable = self.tiles.walkable[x0:x1, y0:y1]
+        lit = seen[x0:x1, y0:y1] & (brightness > 0)
+        revealed = self.revealed[x0:x1, y0:y1]
+        revealed |= lit
+
         # draw the level on the console
-        for y in range(self.top_left[1], self.bottom_right[1]):
-            for x in range(self.top_left[0], self.bottom_right[0]):
-                if (libtcod.map_is_in_fov(self.fov_map, x, y) and self.tiles[x][y].brightness > 0) \
-                        or self.tiles[x][y].is_revealed:
-                    self.tiles[x][y].is_revealed = True
-                    if libtcod.map_is_in_fov(self.fov_map, x, y) and self.tiles[x][y].brightness > 0:
-                        if not self.tiles[x][y].is_walkable:
-                            color = Light.calculate_tile_color(self.tiles[x][y].brightness,
-                                                               libtcod.darkest_sepia, self.color_lit_wall)
-                            libtcod.console_put_char_ex(self.con, x_draw, y_draw, '#',
-                                                        color, libtcod.BKGND_SET)
-                        else:
-                            # floor
-                            color = Light.calculate_tile_color(self.tiles[x][y].brightness,
-                                                               libtcod.darkest_sepia, self.color_lit_floor)
-                            libtcod.console_put_char_ex(self.con, x_draw, y_draw, '.',
-                                                        color, libtcod.BKGND_SET)
-                    else:
-                        if not self.tiles[x][y].is_walkable:
-                            libtcod.console_put_char_ex(self.con, x_draw, y_draw, '#',
-                                                        self.color_unlit_wall, libtcod.BKGND_SET)
-                        else:
-                            # floor
-                            libtcod.console_put_char_ex(self.con, x_draw, y_draw, '.',
-                                                        self.color_unlit_floor, libtcod.BKGND_SET)
-                x_draw += 1
-            y_draw += 1
-            x_draw = 0
+        chars = numpy.where(walkable, ord('.'), ord('#'))
+        chars[~revealed] = ord(' ')
+        colors = numpy.where(walkable[:, :, numpy.newaxis], self.rgb(self.color_unlit_floor),
+                             self.rgb(self.color_unlit_wall))
+        colors[lit] = self.shade(brightness, walkable, self.top_left, self.bottom_right)[lit]
+        self.con.put_block(0, 0, chars.T, colors.transpose(1, 0, 2))
+
+    def shade(self, brightness, walkable, top_left, bottom_right):
+        # (w, h, 3) colors of the tiles between top_left and bottom_right as lit by the light map
+        steps = Light.color_steps(brightness)
+        walls = Light.color_table(darkest_sepia, self.color_lit_wall)[steps]
+        floors = Light.color_table(darkest_sepia, self.color_lit_floor)[steps]
+        colors = numpy.where(walkable[:, :, numpy.newaxis], floors, walls)
+        tint = self.light_map.tint_region(top_left[0], top_left[1], bottom_right[0], bottom_right[1])
+        return (colors * tint).astype(numpy.uint8)
+
+    @staticmethod
+    def rgb(color):
+        return numpy.array([color.r, color.g, color.b], dtype=numpy.int32)
 
     @staticmethod
     def will_spawn(odds):
-        return libtcod.random_get_int(0, 0, odds - 1) == odds - 1
+        return random_int(0, odds - 1) == odds - 1
 
 
 # helps make new rooms
 class Room:
+    __slots__ = ('x1', 'y1', 'x2', 'y2')
+
     def __init__(self, x, y, w, h):
         self.x1 = x
         self.y1 = y
@@ -308,19 +419,66 @@ class Room:
         return self.x1 <= x <= self.x2 and self.y1 <= y <= self.y2
 
 
+# tile properties stored as one array per field, indexed [x, y]
+class TileGrid:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.walkable = numpy.zeros((width, height), dtype=bool)
+        self.transparent = numpy.zeros((width, height), dtype=bool)
+
+    def set_floor(self, x, y):
+        # x and y can be indices or slices
+        self.walkable[x, y] = True
+        self.transparent[x, y] = True
+
+    def __len__(self):
+        return self.width
+
+    def __getitem__(self, x):
+        # tiles[x][y] gives a Tile view like the old list of lists
+        return TileColumn(self, x)
+
+
+class TileColumn:
+    __slots__ = ('grid', 'x')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def __len__(self):
+        return self.grid.height
+
+    def __getitem__(self, y):
+        return Tile(self.grid, self.x, y)
+
+
+# a view of one cell of a TileGrid
 class Tile:
-    def __init__(self, is_walkable, x, y, is_transparent=None, is_revealed=False):
-        self.is_walkable = is_walkable
+    __slots__ = ('grid', 'x', 'y')
+
+    def __init__(self, grid, x, y):
+        self.grid = grid
         self.x = x
         self.y = y
-        self.brightness = 0
 
-        if is_transparent is None:
-            is_transparent = is_walkable
-        self.is_transparent = is_transparent
+    @property
+    def is_walkable(self):
+        return bool(self.grid.walkable[self.x, self.y])
+
+    @is_walkable.setter
+    def is_walkable(self, is_walkable):
+        self.grid.walkable[self.x, self.y] = is_walkable
+
+    @property
+    def is_transparent(self):
+        return bool(self.grid.transparent[self.x, self.y])
 
-        self.is_revealed = is_revealed
+    @is_transparent.setter
+    def is_transparent(self, is_transparent):
+        self.grid.transparent[self.x, self.y] = is_transparent
 
     def distance_to(self, x, y):
         distance = math.fabs(self.x - x) + math.fabs(self.y - y)
-        return distance
\ No newline at end of file
+        return distance
@@ -0,0 +1,49 @@
+# !usr/bin/python
+
+import sys
+
+
+def object_bytes(obj):
+    # size of a python object, with its attribute dict if it has one
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def entity_bytes(entity):
+    # an entity with the light and noise it owns, the light's footprint is counted with the light map
+    size = object_bytes(entity)
+    if entity.light is not None:
+        size += object_bytes(entity.light) + entity.light.tint.nbytes
+    if entity.noise is not None:
+        size += object_bytes(entity.noise)
+    return size
+
+
+def floor_memory(game):
+    # (part, bytes) held by the current floor, python objects are counted without the values they share
+    level = game.level
+    tiles = [level.tiles.walkable, level.tiles.transparent, level.revealed]
+
+    light_map = [level.light_map.brightness, level.light_map.rgb, level.light_map.stamp]
+    for e in level.light_sources:
+        if e.light.footprint is not None:
+            light_map += [e.light.footprint.falloff, e.light.footprint.mask]
+
+    fields = [level.player_distances.distances] + [losses for _, _, losses in level.sounds.fields.values()]
+    if level.room_graph is not None:
+        fields += [level.room_graph.room_at, level.room_graph.corridor_at, level.room_graph.distances,
+                   level.room_graph.next_room]
+
+    # monsters waiting to spawn are off the floor but still held by the scheduler
+    entities = game.entities + [monster for monster in game.scheduler.monsters if monster.x is None]
+    for free in game.free_entities.values():
+        entities += free
+
+    return [('tiles', sum(array.nbytes for array in tiles)),
+            ('light map', sum(array.nbytes for array in light_map)),
+            ('fields', sum(array.nbytes for array in fields)),
+            ('entities', sum(entity_bytes(e) for e in entities)),
+            ('native maps', level.native_memory_bytes()),
+            ('native paths', sum(monster.path.native_memory_bytes() for monster in game.scheduler.monsters))]
@@ -0,0 +1,23 @@
+# !usr/bin/python
+
+import random
+
+# the native libtcod, or None where its shared library can't be loaded, like on headless build machines,
+# everything that needs it checks here and falls back to the python parts of the game
+try:
+    from lib import libtcodpy as libtcod
+except OSError:
+    libtcod = None
+
+
+def random_int(low, high):
+    # libtcod's default generator when it is loaded, python's otherwise, both include high
+    if libtcod is None:
+        return random.randint(low, high)
+    return libtcod.random_get_int(0, low, high)
+
+
+def random_float(low, high):
+    if libtcod is None:
+        return random.uniform(low, high)
+    return libtcod.random_get_float(0, low, high)
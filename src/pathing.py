@@ -1,9 +1,26 @@
 # !usr/bin/python
 
-from lib import libtcodpy as libtcod
+import heapq
+import numpy
+from collections import deque
+from src.colors import lerp
+from src.colors import white
+from src.fov import FOV_RESTRICTIVE
+from src.fov import FOV_SHADOW
+from src.fov import compute_fov
+from src.fov import native_map_bytes
+from src.fov import set_fov_properties
+from src.native import libtcod
+
+
+def native_path_bytes(width, height):
+    # size of the grid, heuristic and direction arrays a TCOD_path_t allocates, the struct itself is left out
+    return 12 * width * height
 
 
 class Noise:
+    __slots__ = ('x', 'y', 'volume', 'con', 'game')
+
     def __init__(self, x, y, volume, con, game):
         self.x = x
         self.y = y
@@ -23,35 +40,585 @@ class Noise:
             self.volume -= 3
 
 
+class SoundMap:
+    MAX_VOLUME = 100  # sound never carries further than this
+    DOOR_DAMPING = 20  # volume lost passing through a closed door, on top of the step
+    MAX_FIELDS = 32  # fields kept for the most recent source positions
+    SILENT = 2 ** 15 - 1
+
+    def __init__(self, walkable, transparent):
+        # sound travels over walkable tiles, the ones that can't be seen through are closed doors
+        self.walkable = walkable
+        self.transparent = transparent
+        # (x, y) of a source -> (x0, y0, [x, y] volume lost on the way from it to each tile of the box at (x0, y0)),
+        # tiles outside the box can't hear the source
+        self.fields = {}
+        self.computed = 0
+
+    def loudness_at(self, source_x, source_y, volume, x, y):
+        # what a sound of the given volume at the source sounds like at (x, y), 0 or less can't be heard
+        # volume is applied last so a changing volume never needs a new field
+        x0, y0, losses = self.field(source_x, source_y)
+        if 0 <= x - x0 < losses.shape[0] and 0 <= y - y0 < losses.shape[1]:
+            return volume - int(losses[x - x0, y - y0])
+        return volume - self.SILENT
+
+    def field(self, x, y):
+        field = self.fields.pop((x, y), None)
+        if field is None:
+            field = self.compute(x, y)
+            if len(self.fields) >= self.MAX_FIELDS:
+                del self.fields[next(iter(self.fields))]
+        # most recently used last
+        self.fields[(x, y)] = field
+        return field
+
+    def compute(self, x, y):
+        # uniform cost search with buckets, each step costs 1 and stepping into a closed door DOOR_DAMPING more,
+        # only over the box sound can cross and on a flat copy with a border of walls so no step needs a bounds check
+        self.computed += 1
+        width, height = self.walkable.shape
+        x0 = max(0, x - self.MAX_VOLUME)
+        y0 = max(0, y - self.MAX_VOLUME)
+        x1 = min(width, x + self.MAX_VOLUME + 1)
+        y1 = min(height, y + self.MAX_VOLUME + 1)
+        stride = y1 - y0 + 2
+        costs = numpy.zeros((x1 - x0 + 2, stride), dtype=numpy.int32)
+        costs[1:-1, 1:-1] = numpy.where(self.transparent[x0:x1, y0:y1], 1, 1 + self.DOOR_DAMPING)
+        costs[1:-1, 1:-1] *= self.walkable[x0:x1, y0:y1]
+        shape = costs.shape
+        costs = costs.ravel().tolist()  # 0 where sound can't go
+
+        losses = [self.SILENT] * len(costs)
+        start = (x - x0 + 1) * stride + y - y0 + 1
+        losses[start] = 0
+        buckets = [[] for _ in range(self.MAX_VOLUME)]
+        buckets[0].append(start)
+        for loss in range(self.MAX_VOLUME):
+            for i in buckets[loss]:
+                if losses[i] != loss:
+                    continue  # reached with a smaller loss since it was bucketed
+                for j in (i - 1, i + 1, i - stride, i + stride):
+                    if costs[j] and loss + costs[j] < losses[j]:
+                        losses[j] = loss + costs[j]
+                        if losses[j] < self.MAX_VOLUME:
+                            buckets[losses[j]].append(j)
+
+        # only the tiles that can hear anything are kept
+        losses = numpy.array(losses, dtype=numpy.int16).reshape(shape)[1:-1, 1:-1]
+        xs, ys = numpy.nonzero(losses < self.MAX_VOLUME)
+        return (x0 + int(xs.min()), y0 + int(ys.min()),
+                losses[xs.min():xs.max() + 1, ys.min():ys.max() + 1].copy())
+
+    def tile_changed(self, x, y):
+        # level tile listener, only fields that reach the tile or one next to it are dropped
+        for source, (x0, y0, losses) in list(self.fields.items()):
+            nearby = losses[max(0, x - 1 - x0):max(0, x + 2 - x0), max(0, y - 1 - y0):max(0, y + 2 - y0)]
+            if nearby.size and nearby.min() < self.MAX_VOLUME:
+                del self.fields[source]
+
+
 class Light:
-    def __init__(self, brightness, fov_map, con, game):
+    MAX_BRIGHTNESS = 10  # brightness at which a tile is drawn in its full color
+    COLOR_STEPS = 100  # number of shades between unlit and full color
+
+    # shades already built by calculate_tile_color and color_table, keyed by the two colors
+    color_cache = {}
+    table_cache = {}
+    __slots__ = ('brightness', 'con', 'game', 'tint', 'is_static', 'footprint')
+
+    def __init__(self, brightness, con, game, is_static=False, color=None):
         self.brightness = brightness
         self.con = con
         self.game = game
-        self.fov_map = libtcod.map_new(game.level.width, game.level.height)
 
-    def calculate_tile_brightness(self, tiles, x, y, top_left, bottom_right, fov_map):
+        # color of the light, mixed with the other lights reaching a tile
+        if color is None:
+            color = white
+        self.tint = numpy.array([color.r, color.g, color.b], dtype=numpy.float32) / 255
+
+        # lights that never move keep their footprint until invalidate() is called
+        self.is_static = is_static
+        self.footprint = None
+
+    def calculate_tile_brightness(self, light_map, x, y, top_left, bottom_right, fov_pool):
         if self.brightness > 0:
-            libtcod.map_compute_fov(fov_map, x, y, self.brightness, True, libtcod.FOV_SHADOW)
-            for iy in range(top_left[1], bottom_right[1]):
-                for ix in range(top_left[0], bottom_right[0]):
-                    if libtcod.map_is_in_fov(fov_map, ix, iy):
-                        tiles[ix][iy].brightness += self.brightness - tiles[ix][iy].distance_to(x, y)
-                        if tiles[ix][iy].brightness < 1:
-                            tiles[ix][iy].brightness = 1
+            if not self.is_static:
+                # only the part of the screen the light can reach
+                footprint = self.compute_footprint(x, y, top_left, bottom_right, fov_pool)
+            else:
+                if self.footprint is None:
+                    self.footprint = self.compute_footprint(x, y, [0, 0], [light_map.width, light_map.height],
+                                                            fov_pool)
+                footprint = self.footprint
+            footprint.apply(light_map, top_left, bottom_right, self.tint)
+
+    def compute_footprint(self, x, y, top_left, bottom_right, fov_pool):
+        # lights only hold on to an fov map while they cast
+        fov_map = fov_pool.borrow()
+        try:
+            return LightFootprint.compute(x, y, self.brightness, top_left, bottom_right, fov_map, fov_pool.transparent)
+        finally:
+            fov_pool.give_back(fov_map)
+
+    def invalidate(self):
+        self.footprint = None
+
+    def invalidate_tile(self, x, y):
+        # a change to tile (x, y) can only affect the footprint if the tile is inside it
+        if self.footprint is not None and self.footprint.contains(x, y):
+            self.footprint = None
 
     @staticmethod
-    def clear_brightness(tiles):
-        for y in range(len(tiles[0])):
-            for x in range(len(tiles)):
-                tiles[x][y].brightness = 0
+    def clear_brightness(light_map):
+        light_map.clear()
 
     @staticmethod
     def calculate_tile_color(brightness, c1, c2):
-        coef = brightness / 10
-        if coef > 1:
-            coef = 1
-        return libtcod.color_lerp(c1, c2, coef)
+        # returns a shared color, don't modify it
+        step = Light.color_step(brightness)
+        key = (step, c1.r, c1.g, c1.b, c2.r, c2.g, c2.b)
+        color = Light.color_cache.get(key)
+        if color is None:
+            color = lerp(c1, c2, step / Light.COLOR_STEPS)
+            Light.color_cache[key] = color
+        return color
+
+    @staticmethod
+    def color_step(brightness):
+        step = int(brightness * Light.COLOR_STEPS / Light.MAX_BRIGHTNESS + 0.5)
+        return min(max(step, 0), Light.COLOR_STEPS)
+
+    @staticmethod
+    def color_table(c1, c2):
+        # (COLOR_STEPS + 1, 3) rgb table for shading whole arrays, index it with color_steps
+        key = (c1.r, c1.g, c1.b, c2.r, c2.g, c2.b)
+        table = Light.table_cache.get(key)
+        if table is None:
+            table = numpy.zeros((Light.COLOR_STEPS + 1, 3), dtype=numpy.uint8)
+            for step in range(Light.COLOR_STEPS + 1):
+                color = Light.calculate_tile_color(step * Light.MAX_BRIGHTNESS / Light.COLOR_STEPS, c1, c2)
+                table[step] = (color.r, color.g, color.b)
+            Light.table_cache[key] = table
+        return table
+
+    @staticmethod
+    def color_steps(brightness):
+        # color_step for a whole brightness array
+        steps = numpy.floor(brightness * (Light.COLOR_STEPS / Light.MAX_BRIGHTNESS) + 0.5)
+        return numpy.clip(steps, 0, Light.COLOR_STEPS).astype(numpy.intp)
+
+
+class LightFootprint:
+    def __init__(self, x0, y0, falloff, mask):
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x0 + falloff.shape[0]
+        self.y1 = y0 + falloff.shape[1]
+        self.falloff = falloff
+        self.mask = mask
+
+    @staticmethod
+    def compute(x, y, radius, top_left, bottom_right, fov_map, transparent):
+        # shadow casts from (x, y) and keeps the falloff inside the radius, clipped to the given bounds
+        seen = compute_fov(fov_map, transparent, x, y, radius, True, FOV_SHADOW)
+        x0 = max(top_left[0], x - radius)
+        y0 = max(top_left[1], y - radius)
+        x1 = max(x0, min(bottom_right[0], x + radius + 1))
+        y1 = max(y0, min(bottom_right[1], y + radius + 1))
+        falloff = radius - LightMap.distance_grid(x0, y0, x1, y1, x, y)
+        return LightFootprint(x0, y0, falloff, seen[x0:x1, y0:y1])
+
+    def contains(self, x, y):
+        return self.x0 <= x < self.x1 and self.y0 <= y < self.y1
+
+    def apply(self, light_map, top_left, bottom_right, tint):
+        # adds the part of the footprint that is on screen to the light map
+        x0 = max(self.x0, top_left[0])
+        y0 = max(self.y0, top_left[1])
+        x1 = min(self.x1, bottom_right[0])
+        y1 = min(self.y1, bottom_right[1])
+        if x0 >= x1 or y0 >= y1:
+            return
+        region = (slice(x0 - self.x0, x1 - self.x0), slice(y0 - self.y0, y1 - self.y0))
+        light_map.add(x0, y0, self.falloff[region], self.mask[region], tint)
+
+
+class LightMap:
+    MAX_FRAME = 2 ** 31 - 1
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        # indexed [x, y] like Level.tiles, a cell is only valid if its stamp matches the current frame
+        self.brightness = numpy.zeros((width, height), dtype=numpy.float32)
+        # red, green and blue light reaching each cell
+        self.rgb = numpy.zeros((width, height, 3), dtype=numpy.float32)
+        self.stamp = numpy.zeros((width, height), dtype=numpy.int32)
+        self.frame = 1
+
+    def clear(self):
+        # starting a new frame makes every cell stale without touching the arrays
+        if self.frame == self.MAX_FRAME:
+            self.stamp.fill(0)
+            self.frame = 0
+        self.frame += 1
+
+    def add(self, x0, y0, values, mask, tint):
+        # adds a light's falloff to the masked cells, lit cells are never darker than 1
+        x1 = x0 + values.shape[0]
+        y1 = y0 + values.shape[1]
+        region = self.brightness[x0:x1, y0:y1]
+        rgb = self.rgb[x0:x1, y0:y1]
+        stamp = self.stamp[x0:x1, y0:y1]
+        stale = stamp != self.frame
+        region[stale] = 0
+        rgb[stale] = 0
+        stamp.fill(self.frame)
+        lit = values[mask]
+        region[mask] += lit
+        numpy.maximum(region, 1, out=region, where=mask)
+        rgb[mask] += numpy.maximum(lit, 1)[:, numpy.newaxis] * tint
+
+    def brightness_at(self, x, y):
+        if self.stamp[x, y] != self.frame:
+            return 0.0
+        return float(self.brightness[x, y])
+
+    def brightness_of(self, xs, ys):
+        # brightness_at for arrays of cells
+        return numpy.where(self.stamp[xs, ys] == self.frame, self.brightness[xs, ys], 0)
+
+    def region(self, x0, y0, x1, y1):
+        # copy of the brightness of [x0, x1) x [y0, y1) for this frame
+        return numpy.where(self.stamp[x0:x1, y0:y1] == self.frame, self.brightness[x0:x1, y0:y1], 0)
+
+    def tint_region(self, x0, y0, x1, y1):
+        # (w, h, 3) color of the light mix over [x0, x1) x [y0, y1), scaled so the strongest channel is 1
+        rgb = self.rgb[x0:x1, y0:y1]
+        peak = rgb.max(axis=2, keepdims=True)
+        lit = (self.stamp[x0:x1, y0:y1] == self.frame)[:, :, numpy.newaxis] & (peak > 0)
+        return numpy.where(lit, rgb / numpy.where(lit, peak, 1), 1)
+
+    def tint_of(self, xs, ys):
+        # (n, 3) tint_region for arrays of cells
+        rgb = self.rgb[xs, ys]
+        peak = rgb.max(axis=1, keepdims=True)
+        lit = (self.stamp[xs, ys] == self.frame)[:, numpy.newaxis] & (peak > 0)
+        return numpy.where(lit, rgb / numpy.where(lit, peak, 1), 1)
+
+    @staticmethod
+    def distance_grid(x0, y0, x1, y1, x, y):
+        # manhattan distance from (x, y) to every cell of [x0, x1) x [y0, y1)
+        dx = numpy.abs(numpy.arange(x0, x1, dtype=numpy.float32) - x)
+        dy = numpy.abs(numpy.arange(y0, y1, dtype=numpy.float32) - y)
+        return dx[:, numpy.newaxis] + dy[numpy.newaxis, :]
+
+
+class FovMapPool:
+    MAX_MAPS = 2
+
+    def __init__(self, source, transparent, width, height):
+        # lends out scratch fov maps that start as a copy of the source map,
+        # transparent is the [x, y] array the source map is built from, for backends that don't use native maps,
+        # without libtcod the source is None and so is every map lent out
+        self.source = source
+        self.transparent = transparent
+        self.width = width
+        self.height = height
+        self.free = []
+        self.allocated = 0
+
+    def borrow(self):
+        if self.source is None:
+            return None
+        if self.free:
+            fov_map = self.free.pop()
+        elif self.allocated < self.MAX_MAPS:
+            fov_map = libtcod.map_new(self.width, self.height)
+            self.allocated += 1
+        else:
+            raise RuntimeError('all ' + str(self.MAX_MAPS) + ' fov maps are already borrowed')
+        libtcod.map_copy(self.source, fov_map)
+        return fov_map
+
+    def give_back(self, fov_map):
+        if fov_map is not None:
+            self.free.append(fov_map)
+
+    def delete(self):
+        for fov_map in self.free:
+            libtcod.map_delete(fov_map)
+        self.free = []
+        self.allocated = 0
+
+    def memory_bytes(self):
+        return self.allocated * native_map_bytes(self.width, self.height)
+
+
+class DistanceField:
+    UNREACHABLE = 2 ** 31 - 1
+    STEPS = [(0, -1), (0, 1), (-1, 0), (1, 0)]  # no diagonals, like the libtcod paths
+
+    def __init__(self, walkable):
+        # steps from every walkable tile to the goal, indexed [x, y] like the walkable array
+        self.walkable = walkable
+        self.distances = numpy.full(walkable.shape, self.UNREACHABLE, dtype=numpy.int32)
+        self.key = None  # (goal x, goal y, map version) the distances were computed for
+
+    def update(self, x, y, map_version):
+        # recomputes the field if the goal or the map changed, returns whether it did
+        key = (x, y, map_version)
+        if key == self.key:
+            return False
+        self.key = key
+
+        # breadth first search over a flat copy of the map with a border of walls, so no step needs a bounds check
+        width, height = self.walkable.shape
+        stride = height + 2
+        padded = numpy.zeros((width + 2, height + 2), dtype=bool)
+        padded[1:-1, 1:-1] = self.walkable
+        unseen = padded.ravel().tolist()
+        distances = [self.UNREACHABLE] * len(unseen)
+        start = (x + 1) * stride + y + 1
+        distances[start] = 0
+        unseen[start] = False
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            distance = distances[i] + 1
+            for j in (i - 1, i + 1, i - stride, i + stride):
+                if unseen[j]:
+                    unseen[j] = False
+                    distances[j] = distance
+                    queue.append(j)
+        self.distances[:] = numpy.array(distances, dtype=numpy.int32).reshape(width + 2, height + 2)[1:-1, 1:-1]
+        return True
+
+    def distance_at(self, x, y):
+        return int(self.distances[x, y])
+
+    def next_step(self, x, y):
+        # a neighbour of (x, y) one step closer to the goal, or None at the goal or if it can't be reached
+        distance = self.distances[x, y]
+        if distance == 0 or distance == self.UNREACHABLE:
+            return None
+        width, height = self.distances.shape
+        for dx, dy in self.STEPS:
+            if 0 <= x + dx < width and 0 <= y + dy < height and self.distances[x + dx, y + dy] == distance - 1:
+                return x + dx, y + dy
+        return None
+
+
+def new_path(fov_map, walkable):
+    # libtcod's a* over the native map when it is loaded, the python one over the walkable array otherwise
+    if libtcod is None:
+        return GridPath(walkable)
+    return NativePath(fov_map, walkable)
+
+
+# a path found by libtcod, walked one step at a time
+class NativePath:
+    def __init__(self, fov_map, walkable):
+        self.path = libtcod.path_new_using_map(fov_map, 0.0)
+        self.width, self.height = walkable.shape
+
+    def compute(self, x0, y0, x1, y1):
+        # a path from (x0, y0) to (x1, y1), empty if there is none
+        libtcod.path_compute(self.path, x0, y0, x1, y1)
+
+    def is_empty(self):
+        return libtcod.path_is_empty(self.path)
+
+    def size(self):
+        return libtcod.path_size(self.path)
+
+    def origin(self):
+        # where the path was walked to so far
+        return libtcod.path_get_origin(self.path)
+
+    def destination(self):
+        return libtcod.path_get_destination(self.path)
+
+    def next_step(self):
+        return libtcod.path_get(self.path, 0)
+
+    def walk(self):
+        libtcod.path_walk(self.path, False)
+
+    def native_memory_bytes(self):
+        return native_path_bytes(self.width, self.height)
+
+    def delete(self):
+        # frees the native path, call before the map it was made from is deleted
+        libtcod.path_delete(self.path)
+
+
+# the same over the walkable array with a* in python, for when libtcod isn't loaded
+class GridPath:
+    def __init__(self, walkable):
+        self.walkable = walkable
+        self.steps = []  # (x, y) still to walk, the next one first
+        self.start = None
+        self.goal = None
+
+    def compute(self, x0, y0, x1, y1):
+        # like libtcod, no diagonals and (x0, y0) itself doesn't need to be walkable
+        self.start = (x0, y0)
+        self.goal = (x1, y1)
+        self.steps = []
+        if (x0, y0) == (x1, y1) or not self.walkable[x1, y1]:
+            return
+
+        # over a flat copy of the map with a border of walls, so no step needs a bounds check
+        width, height = self.walkable.shape
+        stride = height + 2
+        padded = numpy.zeros((width + 2, height + 2), dtype=bool)
+        padded[1:-1, 1:-1] = self.walkable
+        open_cells = padded.ravel().tolist()
+        start = (x0 + 1) * stride + y0 + 1
+        goal = (x1 + 1) * stride + y1 + 1
+        costs = {start: 0}
+        came_from = {start: None}
+        queue = [(abs(x1 - x0) + abs(y1 - y0), 0, start)]
+        while queue:
+            _, cost, i = heapq.heappop(queue)
+            if i == goal:
+                break
+            if cost > costs[i]:
+                continue  # reached with a smaller cost since it was queued
+            cost += 1
+            for j in (i - 1, i + 1, i - stride, i + stride):
+                if open_cells[j] and cost < costs.get(j, cost + 1):
+                    costs[j] = cost
+                    came_from[j] = i
+                    heapq.heappush(queue, (cost + abs(j // stride - 1 - x1) + abs(j % stride - 1 - y1), cost, j))
+        else:
+            return
+
+        while i != start:
+            self.steps.append((i // stride - 1, i % stride - 1))
+            i = came_from[i]
+        self.steps.reverse()
+
+    def is_empty(self):
+        return not self.steps
+
+    def size(self):
+        return len(self.steps)
+
+    def origin(self):
+        return self.start
+
+    def destination(self):
+        return self.goal
+
+    def next_step(self):
+        return self.steps[0]
+
+    def walk(self):
+        self.start = self.steps.pop(0)
+
+    def native_memory_bytes(self):
+        return 0
+
+    def delete(self):
+        self.steps = []
+
+
+class RoomGraph:
+    def __init__(self, rooms, walkable):
+        # rooms are linked when a corridor runs between them without crossing another room,
+        # long trips are planned room by room and only the legs between neighbouring rooms use a*
+        self.rooms = rooms
+        self.room_at = numpy.full(walkable.shape, -1, dtype=numpy.int32)
+        for i, room in enumerate(rooms):
+            self.room_at[room.x1 + 1:room.x2, room.y1 + 1:room.y2] = i
+
+        # corridor tiles in connected pieces, with the rooms each piece opens into
+        self.corridor_at = numpy.full(walkable.shape, -1, dtype=numpy.int32)
+        self.corridor_rooms = []
+        self.label_corridors(walkable)
+
+        # shortest room to room distances over the corridors and the next room to head for
+        count = len(rooms)
+        self.distances = numpy.full((count, count), numpy.inf)
+        numpy.fill_diagonal(self.distances, 0)
+        for piece_rooms in self.corridor_rooms:
+            for a in piece_rooms:
+                for b in piece_rooms:
+                    if a != b:
+                        self.distances[a, b] = min(self.distances[a, b], self.center_distance(a, b))
+        self.next_room = numpy.where(numpy.isfinite(self.distances), numpy.arange(count)[numpy.newaxis, :], -1)
+        for k in range(count):
+            through = self.distances[:, k:k + 1] + self.distances[k:k + 1, :]
+            shorter = through < self.distances
+            self.distances = numpy.where(shorter, through, self.distances)
+            self.next_room = numpy.where(shorter, self.next_room[:, k:k + 1], self.next_room)
+
+    def label_corridors(self, walkable):
+        width, height = walkable.shape
+        room_at = self.room_at.tolist()
+        corridor = (walkable & (self.room_at < 0)).tolist()
+        corridor_at = self.corridor_at.tolist()
+        for sx, sy in numpy.argwhere(walkable & (self.room_at < 0)).tolist():
+            if corridor_at[sx][sy] >= 0:
+                continue
+            piece = len(self.corridor_rooms)
+            piece_rooms = set()
+            corridor_at[sx][sy] = piece
+            stack = [(sx, sy)]
+            while stack:
+                x, y = stack.pop()
+                for dx, dy in DistanceField.STEPS:
+                    nx = x + dx
+                    ny = y + dy
+                    if not (0 <= nx < width and 0 <= ny < height):
+                        continue
+                    if room_at[nx][ny] >= 0:
+                        piece_rooms.add(room_at[nx][ny])
+                    elif corridor[nx][ny] and corridor_at[nx][ny] < 0:
+                        corridor_at[nx][ny] = piece
+                        stack.append((nx, ny))
+            self.corridor_rooms.append(sorted(piece_rooms))
+        self.corridor_at[:] = corridor_at
+
+    def center_distance(self, a, b):
+        return self.distance_to_center(a, *self.rooms[b].center())
+
+    def distance_to_center(self, room, x, y):
+        center_x, center_y = self.rooms[room].center()
+        return abs(center_x - x) + abs(center_y - y)
+
+    def rooms_near(self, x, y):
+        # the room (x, y) is in, or the rooms its corridor opens into
+        if self.room_at[x, y] >= 0:
+            return [int(self.room_at[x, y])]
+        if self.corridor_at[x, y] >= 0:
+            return self.corridor_rooms[self.corridor_at[x, y]]
+        return []
+
+    def waypoints(self, x0, y0, x1, y1):
+        # the centers of the rooms to pass through on the way from (x0, y0) to (x1, y1), then (x1, y1) itself
+        goals = self.rooms_near(x1, y1)
+        starts = self.rooms_near(x0, y0)
+        if not goals or not starts:
+            return [(x1, y1)]
+        goal = min(goals, key=lambda room: self.distance_to_center(room, x1, y1))
+        start = min(starts, key=lambda room: self.distance_to_center(room, x0, y0) + self.distances[room, goal])
+        if self.next_room[start, goal] < 0:
+            return [(x1, y1)]
+
+        points = []
+        if self.room_at[x0, y0] < 0 and start != goal:
+            points.append(self.rooms[start].center())
+        room = start
+        while room != goal:
+            room = int(self.next_room[room, goal])
+            if room != goal:
+                points.append(self.rooms[room].center())
+        points.append((x1, y1))
+        return points
 
 
 class Fov:
@@ -65,17 +632,14 @@ class Fov:
 
     @staticmethod
     def create(fov_map, level):
-        for y in range(level.height):
-            for x in range(level.width):
-                libtcod.map_set_properties(fov_map, x, y,
-                                           level.tiles[x][y].is_transparent,
-                                           level.tiles[x][y].is_walkable)
+        set_fov_properties(fov_map, level.tiles.transparent, level.tiles.walkable)
 
     def compute(self):
         # compute fov of an entity
-        libtcod.map_compute_fov(self.fov_map,
-                                self.entity.x,
-                                self.entity.y,
-                                self.entity.sight_range,
-                                True,
-                                libtcod.FOV_RESTRICTIVE)
\ No newline at end of file
+        return compute_fov(self.fov_map,
+                           self.level.tiles.transparent,
+                           self.entity.x,
+                           self.entity.y,
+                           self.entity.sight_range,
+                           True,
+                           FOV_RESTRICTIVE)
\ No newline at end of file
@@ -0,0 +1,113 @@
+# !usr/bin/python
+
+import json
+import time
+from collections import deque
+
+
+# times the phases of each frame and keeps rolling percentiles of the last WINDOW frames
+class Profiler:
+    WINDOW = 100
+    OVERLAY_PHASES = ['light', 'map', 'ents', 'ai', 'plyr', 'blit', 'frame']
+    OVERLAY_RATES = [('fov', 'fov_hits', 'fov_misses')]  # (label, hit counter, miss counter)
+    OVERLAY_PER_SECOND = [('path', 'path_computes')]  # (label, counter)
+
+    def __init__(self, path=None):
+        self.samples = {}  # phase -> deque of seconds per frame
+        self.frame_times = {}  # phase -> seconds in the current frame
+        self.counters = {}  # counter -> count in the current frame
+        self.totals = {}  # counter -> count since the profiler was created
+        self.counter_samples = {}  # counter -> deque of counts per frame
+        self.frame_ends = deque(maxlen=self.WINDOW + 1)  # wall clock time at the end of each frame
+        self.frame = 0
+        self.show_overlay = False
+
+        # every finished frame is written as a line of json when a path is given
+        self.file = open(path, 'w') if path else None
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def add(self, name, seconds):
+        self.frame_times[name] = self.frame_times.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+        self.totals[name] = self.totals.get(name, 0) + amount
+
+    def hit_rate(self, hits, misses):
+        # share of hits since the profiler was created
+        total = self.totals.get(hits, 0) + self.totals.get(misses, 0)
+        if total == 0:
+            return 0.0
+        return self.totals.get(hits, 0) / total
+
+    def end_frame(self):
+        # the input phase is excluded from the frame total as it mostly waits for the player
+        self.frame_times['frame'] = sum(seconds for name, seconds in self.frame_times.items() if name != 'input')
+        for name, seconds in self.frame_times.items():
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.WINDOW)
+            self.samples[name].append(seconds)
+        for name in set(self.counter_samples) | set(self.counters):
+            if name not in self.counter_samples:
+                self.counter_samples[name] = deque(maxlen=self.WINDOW)
+            self.counter_samples[name].append(self.counters.get(name, 0))
+        self.frame_ends.append(time.perf_counter())
+
+        if self.file is not None:
+            self.file.write(json.dumps({'frame': self.frame,
+                                        'ms': {name: round(seconds * 1000, 4)
+                                               for name, seconds in self.frame_times.items()},
+                                        'counters': self.counters}) + '\n')
+
+        self.frame += 1
+        self.frame_times = {}
+        self.counters = {}
+
+    def per_second(self, name):
+        # how often a counter went up per second of wall clock time over the last WINDOW frames
+        if len(self.frame_ends) < 2 or name not in self.counter_samples:
+            return 0.0
+        frames = len(self.frame_ends) - 1
+        return sum(list(self.counter_samples[name])[-frames:]) / (self.frame_ends[-1] - self.frame_ends[0])
+
+    def percentile(self, name, percent):
+        samples = self.samples.get(name)
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def overlay_lines(self, width):
+        # "phase p50/p95" in milliseconds, "cache hit%" and "counter n/s", wrapped to width
+        entries = [name + ' ' + format(self.percentile(name, 50) * 1000, '.1f') + '/' +
+                   format(self.percentile(name, 95) * 1000, '.1f') for name in self.OVERLAY_PHASES]
+        entries += [label + ' ' + format(self.hit_rate(hits, misses) * 100, '.0f') + '%'
+                    for label, hits, misses in self.OVERLAY_RATES]
+        entries += [label + ' ' + format(self.per_second(name), '.1f') + '/s'
+                    for label, name in self.OVERLAY_PER_SECOND]
+        lines = ['']
+        for entry in entries:
+            if lines[-1] and len(lines[-1]) + 1 + len(entry) > width:
+                lines.append('')
+            lines[-1] = (lines[-1] + ' ' + entry).strip()
+        return lines
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class _Phase:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
@@ -0,0 +1,212 @@
+# !usr/bin/python
+
+import numpy
+from src.native import libtcod
+
+
+# libtcod's codes for the keys the game reads, so scripted keys and the game don't need libtcod to name them
+KEY_UP = 14
+KEY_LEFT = 15
+KEY_RIGHT = 16
+KEY_DOWN = 17
+
+
+# a key press with the fields the game reads, headless stand-in for libtcod.Key
+class Key:
+    def __init__(self, vk=0, c=0):
+        self.vk = vk  # a libtcod KEY_* code, 0 for none
+        self.c = c  # the character code of printable keys
+
+
+# an in-memory console, everything is drawn here before it is sent to libtcod,
+# colors are (r, g, b) tuples or anything that iterates like one, libtcod colors included
+class FrameBuffer:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        # indexed [y, x] like a libtcod console
+        self.chars = numpy.full((height, width), ord(' '), dtype=numpy.int32)
+        self.fg = numpy.zeros((height, width, 3), dtype=numpy.uint8)
+        self.bg = numpy.zeros((height, width, 3), dtype=numpy.uint8)
+        self.default_fg = (255, 255, 255)
+
+    def clear(self):
+        self.chars.fill(ord(' '))
+        self.fg.fill(0)
+        self.bg.fill(0)
+
+    def set_default_foreground(self, color):
+        self.default_fg = tuple(color)
+
+    def put_char(self, x, y, char, color=None):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            if color is None:
+                color = self.default_fg
+            self.chars[y, x] = ord(char)
+            self.fg[y, x] = tuple(color)
+
+    def put_chars(self, xs, ys, chars, fg):
+        # put_char for arrays of positions, character codes and (n, 3) colors, positions off the console are skipped
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        self.chars[ys[inside], xs[inside]] = chars[inside]
+        self.fg[ys[inside], xs[inside]] = fg[inside]
+
+    def print(self, x, y, text):
+        text = text[:max(0, self.width - x)]
+        if 0 <= y < self.height and text:
+            self.chars[y, x:x + len(text)] = [ord(c) for c in text]
+            self.fg[y, x:x + len(text)] = self.default_fg
+
+    def text(self):
+        # the characters on screen, one line per row, for comparing frames
+        return '\n'.join(''.join(chr(c) for c in row).rstrip() for row in self.chars.tolist())
+
+    def put_block(self, x, y, chars, fg):
+        # copies (h, w) chars and (h, w, 3) colors with their top left corner at (x, y)
+        h, w = chars.shape
+        self.chars[y:y + h, x:x + w] = chars
+        self.fg[y:y + h, x:x + w] = fg
+        self.bg[y:y + h, x:x + w] = 0
+
+
+# writes frames to a libtcod console, only touching the cells that changed since the last frame,
+# this and LibtcodBackend need libtcod loaded, the rest of the module runs without it
+class ConsoleRenderer:
+    FULL_UPLOAD_RATIO = 0.25  # above this fraction of changed cells the whole console is uploaded at once
+    UNKNOWN = -1  # char of a cell whose content on the console isn't known
+
+    def __init__(self, con, width, height, view_height):
+        self.con = con
+        self.width = width
+        self.height = height
+        self.view_height = view_height  # the first view_height rows scroll with the map
+
+        # copy of what is currently on the console
+        self.front = FrameBuffer(width, height)
+        self.front.chars.fill(self.UNKNOWN)
+        self.scratch = None
+        self.top_left = None
+        self.cells_written = 0
+        # libtcod colors by (r, g, b), the same few are written over and over
+        self.colors = {}
+
+    def present(self, frame, top_left=None):
+        if top_left is not None:
+            if self.top_left is not None and top_left != self.top_left:
+                self.scroll(top_left[0] - self.top_left[0], top_left[1] - self.top_left[1])
+            self.top_left = list(top_left)
+
+        changed = (frame.chars != self.front.chars) | (frame.fg != self.front.fg).any(axis=2) | \
+                  (frame.bg != self.front.bg).any(axis=2)
+        ys, xs = numpy.nonzero(changed)
+        if len(ys) > self.FULL_UPLOAD_RATIO * self.width * self.height:
+            self.upload(frame)
+            self.cells_written = self.width * self.height
+        else:
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                libtcod.console_put_char_ex(self.con, x, y, int(frame.chars[y, x]),
+                                            self.color(frame.fg[y, x].tolist()),
+                                            self.color(frame.bg[y, x].tolist()))
+            self.cells_written = len(ys)
+
+        self.front.chars[:] = frame.chars
+        self.front.fg[:] = frame.fg
+        self.front.bg[:] = frame.bg
+
+    def color(self, rgb):
+        # returns a shared color, don't modify it
+        rgb = tuple(rgb)
+        color = self.colors.get(rgb)
+        if color is None:
+            color = libtcod.Color(*rgb)
+            self.colors[rgb] = color
+        return color
+
+    def upload(self, frame):
+        libtcod.console_fill_char(self.con, frame.chars.ravel())
+        fg = frame.fg.astype(numpy.int32)
+        bg = frame.bg.astype(numpy.int32)
+        libtcod.console_fill_foreground(self.con, fg[:, :, 0].ravel(), fg[:, :, 1].ravel(), fg[:, :, 2].ravel())
+        libtcod.console_fill_background(self.con, bg[:, :, 0].ravel(), bg[:, :, 1].ravel(), bg[:, :, 2].ravel())
+
+    def scroll(self, dx, dy):
+        # the camera moved by (dx, dy), move the map part of the console the other way so only the new edge differs
+        w = self.width - abs(dx)
+        h = self.view_height - abs(dy)
+        view = (slice(0, self.view_height), slice(0, self.width))
+        if w <= 0 or h <= 0:
+            self.front.chars[view] = self.UNKNOWN
+            return
+
+        src_x, dst_x = max(dx, 0), max(-dx, 0)
+        src_y, dst_y = max(dy, 0), max(-dy, 0)
+        if self.scratch is None:
+            self.scratch = libtcod.console_new(self.width, self.view_height)
+        libtcod.console_blit(self.con, src_x, src_y, w, h, self.scratch, 0, 0)
+        libtcod.console_blit(self.scratch, 0, 0, w, h, self.con, dst_x, dst_y)
+
+        for plane in (self.front.chars, self.front.fg, self.front.bg):
+            shifted = plane[src_y:src_y + h, src_x:src_x + w].copy()
+            plane[dst_y:dst_y + h, dst_x:dst_x + w] = shifted
+        # the uncovered edge holds stale cells on the console
+        known = numpy.zeros((self.view_height, self.width), dtype=bool)
+        known[dst_y:dst_y + h, dst_x:dst_x + w] = True
+        self.front.chars[view][~known] = self.UNKNOWN
+
+
+# draws to an SDL window through libtcod
+class LibtcodBackend:
+    def __init__(self, width, height, view_height, title, font, fps):
+        libtcod.console_set_custom_font(font, libtcod.FONT_TYPE_GREYSCALE | libtcod.FONT_LAYOUT_ASCII_INROW)
+        libtcod.console_init_root(width, height, title, False)
+        libtcod.sys_set_fps(fps)
+        libtcod.console_disable_keyboard_repeat()
+        self.width = width
+        self.height = height
+        self.console = libtcod.console_new(width, height)
+        self.renderer = ConsoleRenderer(self.console, width, height, view_height)
+
+    def present(self, frame, top_left=None):
+        self.renderer.present(frame, top_left)
+        libtcod.console_blit(self.console, 0, 0, self.width, self.height, 0, 0, 0)
+        libtcod.console_flush()
+
+    def wait_for_keypress(self):
+        return libtcod.console_wait_for_keypress(True)
+
+    def check_for_keypress(self):
+        return libtcod.console_check_for_keypress(libtcod.KEY_PRESSED)
+
+    def is_window_closed(self):
+        return libtcod.console_is_window_closed()
+
+
+# keeps frames in memory and plays back scripted keys, for tests, benchmarks and simulation without a window
+class HeadlessBackend:
+    def __init__(self, width, height, keys=(), max_frames=None):
+        # keys are Key or libtcod.Key objects, the backend closes once they run out or after max_frames frames
+        self.screen = FrameBuffer(width, height)
+        self.keys = list(reversed(keys))
+        self.max_frames = max_frames
+        self.frames = 0
+        self.closed = False
+
+    def present(self, frame, top_left=None):
+        self.screen.chars[:] = frame.chars
+        self.screen.fg[:] = frame.fg
+        self.screen.bg[:] = frame.bg
+        self.frames += 1
+        if self.max_frames is not None and self.frames >= self.max_frames:
+            self.closed = True
+
+    def wait_for_keypress(self):
+        if not self.keys:
+            self.closed = True
+            return Key()
+        return self.keys.pop()
+
+    def check_for_keypress(self):
+        return self.wait_for_keypress()
+
+    def is_window_closed(self):
+        return self.closed